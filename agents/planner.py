@@ -1,8 +1,13 @@
+import os
 import json
 import re
-from core.db.schema_inspector import get_db_summary_for_planner_agent
+from core.db.schema_inspector import get_db_summary_for_planner_agent, get_db_schema_for_sql_agent
 from core.llm.llm_client import generate_response
 
+# Fused plan-and-execute: the planner also writes the SQL for SQL steps, so the
+# separate TextToSQL call only happens when that SQL fails validation or execution.
+PLANNER_FUSED_SQL = os.getenv("PLANNER_FUSED_SQL", "false").lower() == "true"
+
 class PlannerAgent:
     def __init__(self):
         self.prompt_template = (
@@ -32,20 +37,41 @@ class PlannerAgent:
             
             "Output Format: JSON array with objects containing: step (int), thought (string), tool (SQL|VECTOR_SEARCH|GENERAL), sub_query (string)\n"
             "For multi-step queries, reference previous results using {{{{step_N_result}}}}\n\n"
+            "{sql_instructions}"
             
             "User Query: \"{query}\"\n"
             "Plan:"
         )
 
+        self.sql_instructions_template = (
+            "Fused SQL mode:\n"
+            "For every SQL step whose sub_query does not reference a previous step, also add a \"sql\" field with a single\n"
+            "PostgreSQL SELECT statement that answers the sub_query. Use ONLY this schema, double-quote column names with spaces,\n"
+            "use ILIKE with % wildcards for name searches, and write semester numbers as Roman numerals (semester 5 -> 'V').\n"
+            "If you are unsure of the SQL, omit the \"sql\" field.\n\n"
+            "Schema:\n{sql_schema}\n\n"
+        )
+
     def _normalize_placeholders(self, plan):
         for obj in plan:
             if isinstance(obj, dict) and "sub_query" in obj:
                 obj["sub_query"] = re.sub(r"\{step_(\d+)_result\}", r"{{step_\1_result}}", obj["sub_query"])
         return plan
 
+    def _drop_dependent_sql(self, plan):
+        # SQL written up front can't see another step's result
+        for obj in plan:
+            if isinstance(obj, dict) and obj.get("sql") and "{{step_" in obj.get("sub_query", ""):
+                del obj["sql"]
+        return plan
+
     def process(self, query: str) -> list:
+        sql_instructions = ""
+        if PLANNER_FUSED_SQL:
+            sql_instructions = self.sql_instructions_template.format(sql_schema=get_db_schema_for_sql_agent())
         prompt = self.prompt_template.format(
             db_summary=get_db_summary_for_planner_agent(),
+            sql_instructions=sql_instructions,
             query=query
         )
         resp = generate_response(prompt, role="PLANNER")
@@ -57,7 +83,7 @@ class PlannerAgent:
                 raise json.JSONDecodeError("No JSON array found in response", resp, 0)
             plan = json.loads(resp[s:e+1])
             plan = self._normalize_placeholders(plan)
-            return plan
+            return self._drop_dependent_sql(plan)
         except Exception as e:
             print(f"Planner parse fail. Raw response was: '{resp}'. Error: {e}")
             # If planning fails, default to a direct vector search of the whole query
@@ -1,4 +1,5 @@
 from core.llm.llm_client import generate_response
+from core.pipeline.context_assembler import ContextAssembler
 
 class ReasonerAgent:
     def __init__(self):
@@ -10,7 +11,10 @@ Context:
 {context}
 Answer:
 """
+        # Keeps the chunk context deduplicated and within the REASONER token budget
+        self.context_assembler = ContextAssembler("REASONER")
+
     def process(self, query: str, chunks: list[str]) -> str:
-        context = "\n---\n".join(chunks)
+        context, _ = self.context_assembler.assemble_chunks(chunks)
         prompt = self.prompt_template.format(query=query, context=context)
         return generate_response(prompt, role="REASONER")
\ No newline at end of file
@@ -26,4 +26,17 @@ class RetrieverAgent:
         print(f"🔎 Searching with query: {query}")
         # Changed from 'hybrid_search' to the new 'search' method
         results = self.vector_store.search(query)
-        return results
\ No newline at end of file
+        return results
+
+    def process_many(self, queries: list[str]) -> list[list[str]]:
+        """
+        Searches several queries in one batched embedding pass and one FAISS search.
+
+        Args:
+            queries (list[str]): The queries to search for.
+
+        Returns:
+            list[list[str]]: The relevant document chunks for each query, in order.
+        """
+        print(f"🔎 Searching with {len(queries)} queries in one batch")
+        return self.vector_store.search_many(queries)
@@ -1,4 +1,4 @@
-from core.llm.llm_client import generate_response
+from core.llm.llm_client import generate_response, stream_response
 
 class SynthesizerAgent:
     def __init__(self):
@@ -44,4 +44,10 @@ class SynthesizerAgent:
     def process(self, query: str, context: str) -> str:
         print("✍️ Synthesizing final answer...")
         prompt = self.prompt_template.format(query=query, context=context)
-        return generate_response(prompt, role="SYNTHESIZER")
\ No newline at end of file
+        return generate_response(prompt, role="SYNTHESIZER")
+
+    def stream(self, query: str, context: str):
+        """Same as process, but yields the answer as text deltas while it is generated."""
+        print("✍️ Streaming final answer...")
+        prompt = self.prompt_template.format(query=query, context=context)
+        yield from stream_response(prompt, role="SYNTHESIZER")
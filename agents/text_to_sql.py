@@ -1,13 +1,20 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from core.db.schema_inspector import get_db_schema_for_sql_agent
+from core.db.schema_inspector import get_db_schema_for_sql_agent, schema_catalog
+from core.db.sql_validator import validate_and_repair
+from core.db.query_runner import execute_read_only, format_result
 from core.llm.llm_client import generate_response
+from core.db.sql_template_cache import SQLTemplateCache
 import re
+import threading
 
 class TextToSQLAgent:
     def __init__(self, db_session: Session):
         self.db_session = db_session
         self.max_retries = 2  # Allow the agent to try to fix its own mistakes
+        # The session is shared by plan steps running on different threads
+        self._db_lock = threading.Lock()
+        # Previously successful SQL, reusable for structurally identical questions
+        self.template_cache = SQLTemplateCache()
         
         # The initial prompt for the first attempt
         self.base_prompt_template = """
@@ -129,10 +136,64 @@ class TextToSQLAgent:
             return f"semester {self._convert_to_roman(int(match.group(1)))}"
         return pattern.sub(replace_match, query)
 
-    def process(self, user_query: str) -> str:
+    def _try_template(self, processed_query: str):
+        """Runs a cached SQL template for the query. Returns None on a miss, an error or no rows."""
+        hit = self.template_cache.lookup(processed_query)
+        if hit is None:
+            return None
+        sql, params = hit
+        print(f"  - 📋 SQL template hit: {sql} {params}")
+        try:
+            with self._db_lock:
+                result = execute_read_only(self.db_session, sql, params)
+        except Exception as e:
+            print(f"  - ⚠️ Cached SQL template failed: {e}. Falling back to the LLM.")
+            self.template_cache.invalidate(processed_query)
+            return None
+        if not result["rows"]:
+            print("  - Cached SQL template returned no rows. Falling back to the LLM.")
+            return None
+        return result
+
+    def _try_planned_sql(self, processed_query: str, planned_sql: str):
+        """Runs SQL the planner wrote in fused mode. Returns None if it is invalid, fails or finds nothing."""
+        validated_sql, repairs, validation_error = validate_and_repair(planned_sql, schema_catalog.get_tables())
+        if validation_error:
+            print(f"  - ⚠️ Planner SQL rejected: {validation_error}. Falling back to TextToSQL.")
+            return None
+        if repairs:
+            print(f"  - 🔧 Repaired planner SQL locally ({'; '.join(repairs)}): {validated_sql}")
+        try:
+            with self._db_lock:
+                result = execute_read_only(self.db_session, validated_sql)
+        except Exception as e:
+            print(f"  - ⚠️ Planner SQL failed: {e}. Falling back to TextToSQL.")
+            return None
+        if not result["rows"]:
+            print("  - Planner SQL returned no rows. Falling back to TextToSQL.")
+            return None
+        self.template_cache.store(processed_query, validated_sql)
+        return result
+
+    def process(self, user_query: str, planned_sql: str = None) -> str:
+        return self.query(user_query, planned_sql)["text"]
+
+    def query(self, user_query: str, planned_sql: str = None) -> dict:
+        """
+        Answers the question from the database. Returns {"text", "result"}, where
+        "text" is the formatted answer (or an error message) and "result" the raw
+        execute_read_only result, or None on failure. `planned_sql` is SQL the
+        planner already wrote; it is used when it validates and returns rows.
+        """
         print(f"⚙️  TextToSQL Agent processing: '{user_query}'")
         processed_query = self._preprocess_query_for_numerals(user_query)
-        
+
+        result = self._try_template(processed_query)
+        if result is None and planned_sql:
+            result = self._try_planned_sql(processed_query, planned_sql)
+        if result is not None:
+            return {"text": format_result(result), "result": result}
+
         last_error = ""
         last_sql = ""
 
@@ -152,15 +213,26 @@ class TextToSQLAgent:
                 last_error = "Model indicated it cannot answer with SQL."
                 continue # Go to the next attempt
 
+            # Check the SQL against the cached schema and fix obvious mistakes
+            # locally, so only genuinely broken SQL costs a retry LLM call.
+            validated_sql, repairs, validation_error = validate_and_repair(generated_sql, schema_catalog.get_tables())
+            if validation_error:
+                print(f"  - ⚠️ SQL rejected before execution: {validation_error}")
+                last_error = validation_error
+                continue
+            if repairs:
+                print(f"  - 🔧 Repaired SQL locally ({'; '.join(repairs)}): {validated_sql}")
+
             try:
                 # Attempt to execute the generated query
-                results = self.db_session.execute(text(generated_sql)).all()
-                if not results: return "No data found."
-                if len(results) == 1 and len(results[0]) == 1: return str(results[0][0])
-                
+                # Read-only, time-limited and row/byte-capped
+                with self._db_lock:
+                    result = execute_read_only(self.db_session, validated_sql)
+                if result["rows"]:
+                    self.template_cache.store(processed_query, validated_sql)
+
                 # Success! Format and return the results.
-                formatted_results = ["- " + ", ".join(f"{key}: {value}" for key, value in row._mapping.items()) for row in results]
-                return "\n".join(formatted_results)
+                return {"text": format_result(result), "result": result}
 
             except Exception as e:
                 # This is the self-correction trigger
@@ -169,4 +241,7 @@ class TextToSQLAgent:
                 # The loop will now continue to the next attempt, feeding this error back to the LLM.
 
         # If all retries fail, return a final error message.
-        return f"Error: After multiple attempts, I could not generate a valid SQL query. Last error: {last_error}"
+        return {
+            "text": f"Error: After multiple attempts, I could not generate a valid SQL query. Last error: {last_error}",
+            "result": None
+        }
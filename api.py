@@ -1,47 +1,241 @@
-import uuid
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from app import initialize_agents_and_services, run_agentic_pipeline
+import os
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import uvicorn
+from fastapi import FastAPI, Request, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from core.pipeline.agentic_pipeline import build_agents, iter_pipeline_events
+from core.llm.llm_client import get_circuit_breaker_states, get_cache_stats, count_round_trips
+from core.pipeline.session_store import create_session_store
+from core.pipeline.conversation_memory import ConversationMemory
 
-app = Flask(__name__)
-CORS(app)
+# --- Configuration ---
+# At most PIPELINE_WORKERS pipelines run at once and PIPELINE_QUEUE_DEPTH more
+# may wait for a worker; anything beyond that is turned away with a 503.
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 4))
+PIPELINE_QUEUE_DEPTH = int(os.getenv("PIPELINE_QUEUE_DEPTH", 16))
+OVERLOAD_RETRY_AFTER_SECONDS = int(os.getenv("OVERLOAD_RETRY_AFTER_SECONDS", 5))
+# Seconds of silence after which /ask/stream sends a heartbeat, so clients can
+# tell a slow step from a dead connection
+HEARTBEAT_SECONDS = float(os.getenv("PROGRESS_HEARTBEAT_SECONDS", 10))
+DISCONNECT_POLL_SECONDS = 0.5
+RESULT_PREVIEW_CHARS = 300
 
-agents = initialize_agents_and_services()
-chat_histories = {}
+app = FastAPI(title="VID API")
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
-@app.route('/start', methods=['POST'])
+agents = build_agents()
+pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+# Bounded, TTL-expiring session history (set SESSION_STORE_BACKEND=sqlite to share it across workers)
+session_store = create_session_store()
+conversation_memory = ConversationMemory(session_store)
+
+class AdmissionController:
+    """
+    Bounds the pipeline work the server accepts: running plus queued requests
+    may not exceed workers + queue_depth, and a session may only have one
+    request in flight (client retries would otherwise stack duplicate runs).
+    """
+    def __init__(self, workers: int, queue_depth: int):
+        self.capacity = workers + queue_depth
+        self.in_flight = 0
+        self.active_sessions = set()
+        self.rejected_overload = 0
+        self.rejected_duplicate = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, session_id: str):
+        """Returns None if admitted, otherwise the HTTP status to reject with."""
+        with self._lock:
+            if session_id in self.active_sessions:
+                self.rejected_duplicate += 1
+                return 429
+            if self.in_flight >= self.capacity:
+                self.rejected_overload += 1
+                return 503
+            self.in_flight += 1
+            self.active_sessions.add(session_id)
+            return None
+
+    def release(self, session_id: str):
+        with self._lock:
+            self.in_flight -= 1
+            self.active_sessions.discard(session_id)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": PIPELINE_WORKERS,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - PIPELINE_WORKERS),
+                "rejected_overload": self.rejected_overload,
+                "rejected_duplicate": self.rejected_duplicate,
+            }
+
+admission = AdmissionController(PIPELINE_WORKERS, PIPELINE_QUEUE_DEPTH)
+
+class AskInput(BaseModel):
+    query: str = ""
+    session_id: str = ""
+
+def _error(status: int, message: str) -> JSONResponse:
+    headers = {"Retry-After": str(OVERLOAD_RETRY_AFTER_SECONDS)} if status in (429, 503) else None
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+def _prepare_turn(data: AskInput):
+    """Validates the request and admits it. Returns an error response, or None once admitted."""
+    if not data.query or not data.session_id:
+        return _error(400, "Query or session_id not provided")
+
+    if session_store.get_history(data.session_id) is None:
+        return _error(400, "Invalid session_id")
+
+    rejection = admission.try_acquire(data.session_id)
+    if rejection == 429:
+        return _error(429, "A request for this session is already in progress")
+    if rejection == 503:
+        return _error(503, "Server is busy, please retry shortly")
+    return None
+
+def _run_pipeline(session_id: str, query: str, stream: bool, cancelled: threading.Event, on_event):
+    """
+    Runs on a pipeline worker. Rewrites the message into a standalone query
+    and feeds every pipeline event to on_event; failures are reported as an
+    "error" event. A disconnect (`cancelled`) is only noticed between events:
+    the LLM call or plan step in progress runs to completion, then the run
+    stops and plan steps that haven't started are dropped. Only completed
+    turns enter the session history, and their summarising runs in the background.
+    """
+    if cancelled.is_set():
+        return
+    answer = None
+    events = None
+    # The rewrite call counts towards the query's LLM round trips too
+    with count_round_trips():
+        try:
+            standalone_query = conversation_memory.standalone_query(session_id, query)
+            events = iter_pipeline_events(standalone_query, agents, stream=stream)
+            for event in events:
+                if cancelled.is_set():
+                    print("  - 🛑 Client disconnected. Cancelling pipeline run.")
+                    break
+                on_event(event)
+                if event["type"] == "done":
+                    answer = event["answer"]
+        except Exception as e:
+            on_event({"type": "error", "message": str(e)})
+        finally:
+            if events is not None:
+                events.close()
+
+    if answer is not None and not cancelled.is_set():
+        conversation_memory.record_turn(session_id, query, answer)
+
+def _serialize_event(event: dict) -> dict:
+    """Makes a pipeline event JSON-friendly and keeps step results to a short preview."""
+    event = dict(event)
+    if event["type"] == "step_finished":
+        result = str(event.pop("result"))
+        event["result_preview"] = result[:RESULT_PREVIEW_CHARS]
+        event["elapsed"] = round(event["elapsed"], 3)
+    elif event["type"] == "done":
+        event["elapsed"] = round(event["elapsed"], 3)
+    return event
+
+@app.post("/start")
 def start():
-    session_id = str(uuid.uuid4())
-    chat_histories[session_id] = []
-    return jsonify({"session_id": session_id})
+    session_id = session_store.create()
+    return {"session_id": session_id}
+
+@app.post("/ask")
+async def ask(data: AskInput, request: Request):
+    error = _prepare_turn(data)
+    if error:
+        return error
+
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    outcome = {}
+    future = loop.run_in_executor(
+        pipeline_executor, _run_pipeline, data.session_id, data.query, False, cancelled,
+        lambda event: outcome.update({event["type"]: event})
+    )
+    # The slot is only freed once the worker has really stopped
+    future.add_done_callback(lambda _: admission.release(data.session_id))
 
-@app.route('/ask', methods=['POST'])
-def ask():
-    data = request.get_json()
-    query = data.get('query')
-    session_id = data.get('session_id')
+    while not future.done():
+        await asyncio.wait({future}, timeout=DISCONNECT_POLL_SECONDS)
+        if not future.done() and await request.is_disconnected():
+            cancelled.set()
+            return _error(499, "Client disconnected")
+    await future
 
-    if not query or not session_id:
-        return jsonify({"error": "Query or session_id not provided"}), 400
+    if "done" not in outcome:
+        return _error(500, outcome.get("error", {}).get("message", "The pipeline did not produce an answer"))
+    return {"response": outcome["done"]["answer"], "llm_round_trips": outcome["done"]["llm_round_trips"]}
 
-    if session_id not in chat_histories:
-        return jsonify({"error": "Invalid session_id"}), 400
+@app.post("/ask/stream")
+async def ask_stream(data: AskInput, request: Request, response_format: str = Query("sse", alias="format")):
+    """
+    Same as /ask, but streams typed progress events while the pipeline runs:
+    status, plan, step_started, step_finished (with timing), answer_delta,
+    heartbeat, error and finally done. Sent as Server-Sent Events, or as NDJSON
+    with ?format=ndjson.
+    """
+    error = _prepare_turn(data)
+    if error:
+        return error
+    ndjson = response_format == "ndjson"
 
-    conversation_history = chat_histories[session_id]
-    conversation_history.append({"role": "user", "content": query})
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    finished = object()
+    cancelled = threading.Event()
+    future = loop.run_in_executor(
+        pipeline_executor, _run_pipeline, data.session_id, data.query, True, cancelled,
+        lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+    )
+    future.add_done_callback(lambda _: events.put_nowait(finished))
+    future.add_done_callback(lambda _: admission.release(data.session_id))
 
-    # The agentic pipeline expects a single query string.
-    # We'll pass the full conversation history for context.
-    full_query = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_history])
+    async def generate():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    event = {"type": "heartbeat"}
+                if event is finished:
+                    return
+                payload = json.dumps(_serialize_event(event))
+                yield payload + "\n" if ndjson else f"event: {event['type']}\ndata: {payload}\n\n"
+        finally:
+            # Runs when the client goes away too: stop the worker between events
+            cancelled.set()
 
-    final_response = ""
-    for response_part in run_agentic_pipeline(full_query, agents):
-        final_response = response_part
-    
-    conversation_history.append({"role": "assistant", "content": final_response})
-    chat_histories[session_id] = conversation_history
+    media_type = "application/x-ndjson" if ndjson else "text/event-stream"
+    return StreamingResponse(generate(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    return jsonify({"response": final_response})
+@app.get("/health")
+def health():
+    """Load, session, LLM circuit breaker and cache state for monitoring."""
+    return {
+        "pipeline": admission.snapshot(),
+        "sessions": session_store.stats(),
+        "router": agents["router"].snapshot() if "router" in agents else None,
+        "speculative_retrieval": agents["speculative_retriever"].snapshot() if "speculative_retriever" in agents else None,
+        "vector_store": agents["retriever"].vector_store.snapshot(),
+        "llm_circuit_breakers": get_circuit_breaker_states(),
+        "llm_cache": get_cache_stats(),
+    }
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    uvicorn.run(app, host=os.getenv("API_HOST", "0.0.0.0"), port=int(os.getenv("API_PORT", 8000)))
@@ -0,0 +1,108 @@
+"""
+Compares FAISS index types on the current vector store: recall@k against exact
+(flat) search, p50/p99 single-query latency, build time and index memory.
+
+Usage:
+    python benchmark_vector_store.py [--types flat ivf hnsw pq ivfpq] [--k 5]
+                                     [--queries 200] [--queries-file queries.txt]
+
+Index parameters come from the VECTOR_INDEX_* environment variables, so the
+same settings can be tried here and then used for build_vector_store.py.
+"""
+import time
+import argparse
+import numpy as np
+import faiss
+from core.rag.vector_store import VectorStore
+from core.rag.index_factory import build_index, default_index_config, index_memory_bytes, INDEX_TYPES
+
+# --- Configuration ---
+PROCESSED_VECTORS_PATH = "data/documents/processed"
+# The parameters that matter for each index type, for the report
+PARAMS_BY_TYPE = {
+    "flat": [],
+    "ivf": ["nlist", "nprobe"],
+    "hnsw": ["hnsw_m", "ef_construction", "ef_search"],
+    "pq": ["pq_m", "pq_bits"],
+    "ivfpq": ["nlist", "nprobe", "pq_m", "pq_bits"],
+}
+
+def load_corpus_vectors(vector_store: VectorStore) -> np.ndarray:
+    """Returns the stored chunk embeddings, re-embedding the texts when the index is lossy."""
+    db = vector_store.db
+    if vector_store.index_config["type"] in ("flat", "hnsw"):
+        return db.index.reconstruct_n(0, db.index.ntotal)
+    print("  - Stored index is compressed or unordered. Re-embedding the chunk texts...")
+    texts = [db.docstore.search(db.index_to_docstore_id[i]).page_content for i in range(db.index.ntotal)]
+    return np.array(vector_store.embeddings.embed_documents(texts), dtype="float32")
+
+def load_query_vectors(vector_store: VectorStore, corpus: np.ndarray, count: int, queries_file: str = None) -> np.ndarray:
+    """Real queries from a file (one per line) if given, otherwise a seeded sample of chunk vectors."""
+    if queries_file:
+        with open(queries_file, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+        return np.array(vector_store.embeddings.embed_documents(queries), dtype="float32")
+    rng = np.random.default_rng(42)
+    return corpus[rng.choice(len(corpus), size=min(count, len(corpus)), replace=False)]
+
+def benchmark_index(index_type: str, corpus: np.ndarray, queries: np.ndarray, exact: np.ndarray, k: int) -> dict:
+    start = time.perf_counter()
+    index, config = build_index(corpus, default_index_config(index_type))
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+
+    recall = np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)])
+    return {
+        "type": index_type,
+        "params": config,
+        "build_s": build_seconds,
+        "recall": recall,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "memory_mb": index_memory_bytes(index) / (1024 * 1024),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types on the current vector store.")
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled chunk vectors used as queries.")
+    parser.add_argument("--queries-file", help="Text file with one real query per line (overrides --queries).")
+    args = parser.parse_args()
+
+    vector_store = VectorStore(PROCESSED_VECTORS_PATH)
+    if vector_store.db is None:
+        print("No vector store found. Run build_vector_store.py first.")
+        return
+
+    corpus = load_corpus_vectors(vector_store)
+    queries = load_query_vectors(vector_store, corpus, args.queries, args.queries_file)
+    k = min(args.k, len(corpus))
+    print(f"\nBenchmarking {len(args.types)} index types on {len(corpus)} vectors with {len(queries)} queries (k={k})...")
+
+    # Exact neighbours are the ground truth for recall@k
+    exact_index = faiss.IndexFlatL2(corpus.shape[1])
+    exact_index.add(corpus)
+    _, exact = exact_index.search(queries, k)
+
+    print(f"\n{'type':<7} {'recall@' + str(k):>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'memory MB':>10}  params")
+    for index_type in args.types:
+        try:
+            r = benchmark_index(index_type, corpus, queries, exact, k)
+        except Exception as e:
+            print(f"{index_type:<7} failed: {e}")
+            continue
+        params = {key: r["params"][key] for key in PARAMS_BY_TYPE[index_type]}
+        print(f"{r['type']:<7} {r['recall']:>9.3f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} "
+              f"{r['build_s']:>8.2f} {r['memory_mb']:>10.2f}  {params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,239 @@
 import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import fitz  # PyMuPDF
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
 from core.rag.vector_store import VectorStore
-from dotenv import load_dotenv
+from core.rag.index_factory import default_index_config
+from core.pipeline.data_version import bump_data_version
 
-load_dotenv() 
 # --- Configuration ---
 RAW_DOCS_PATH = "data/documents/raw"
 PROCESSED_VECTORS_PATH = "data/documents/processed"
+# Per-file content hashes and chunk IDs of what is in the vector store
+MANIFEST_PATH = os.path.join(PROCESSED_VECTORS_PATH, "manifest.json")
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+# Extraction runs in worker processes, a few pages per task; chunks are
+# embedded in fixed-size batches as the pages come back.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", 8))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 256))
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
 
-def process_documents():
-    """
-    Processes all documents in the RAW_DOCS_PATH, chunks them,
-    and builds a new vector store.
-    """
-    print(f"Starting document processing from '{RAW_DOCS_PATH}'...")
-    all_docs = []
+_splitter = None
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest() -> dict:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    # 1. Load documents from the raw directory
-    for filename in os.listdir(RAW_DOCS_PATH):
+def save_manifest(manifest: dict):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def scan_raw_documents() -> dict:
+    """Returns {filename: sha256} for every supported file in RAW_DOCS_PATH."""
+    hashes = {}
+    for filename in sorted(os.listdir(RAW_DOCS_PATH)):
         file_path = os.path.join(RAW_DOCS_PATH, filename)
         if not os.path.isfile(file_path):
             continue
+        if not filename.endswith(SUPPORTED_EXTENSIONS):
+            print(f"    - Skipping unsupported file type: {filename}")
+            continue
+        hashes[filename] = hash_file(file_path)
+    return hashes
+
+def _get_splitter():
+    # One splitter per worker process
+    global _splitter
+    if _splitter is None:
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return _splitter
 
-        print(f"  - Loading file: {filename}")
+def extract_and_split(task: tuple) -> tuple:
+    """
+    Worker: extracts pages [start, end) of one file and splits each page on
+    its own, so no whole-document string is ever built. Returns
+    (filename, [(page_number, [chunk_text, ...]), ...]) with 1-based pages.
+    """
+    filename, start, end = task
+    file_path = os.path.join(RAW_DOCS_PATH, filename)
+    splitter = _get_splitter()
+    pages = []
+    if filename.endswith(".pdf"):
+        with fitz.open(file_path) as doc:
+            for page_number in range(start, end):
+                pages.append((page_number + 1, splitter.split_text(doc.load_page(page_number).get_text())))
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            pages.append((1, splitter.split_text(f.read())))
+    return filename, pages
+
+def plan_tasks(filenames: list) -> tuple:
+    """
+    Cuts every file into page-range tasks (a text file is a single page).
+    Returns (tasks, {filename: error}) for files that couldn't be opened.
+    """
+    tasks, errors = [], {}
+    for filename in filenames:
+        if not filename.endswith(".pdf"):
+            tasks.append((filename, 0, 1))
+            continue
         try:
-            if filename.endswith(".pdf"):
-                with fitz.open(file_path) as doc:
-                    text = "".join(page.get_text() for page in doc)
-                    all_docs.append({"source": filename, "content": text})
-            elif filename.endswith(".txt"):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
-                    all_docs.append({"source": filename, "content": text})
-            else:
-                print(f"    - Skipping unsupported file type: {filename}")
+            with fitz.open(os.path.join(RAW_DOCS_PATH, filename)) as doc:
+                page_count = doc.page_count
         except Exception as e:
-            print(f"    - Error processing file {filename}: {e}")
+            errors[filename] = e
+            continue
+        tasks.extend((filename, start, min(start + INGEST_PAGES_PER_TASK, page_count))
+                     for start in range(0, page_count, INGEST_PAGES_PER_TASK))
+    return tasks, errors
+
+def stream_pages(filenames: list):
+    """
+    Runs extraction on a process pool with a bounded number of tasks in
+    flight and yields (filename, pages, error) as tasks finish.
+    """
+    tasks, errors = plan_tasks(filenames)
+    for filename, error in errors.items():
+        yield filename, [], error
+    pending_tasks = iter(tasks)
+    with ProcessPoolExecutor(max_workers=max(1, INGEST_WORKERS)) as pool:
+        in_flight = {}
+
+        def submit_next():
+            task = next(pending_tasks, None)
+            if task is not None:
+                in_flight[pool.submit(extract_and_split, task)] = task
 
-    if not all_docs:
+        for _ in range(max(1, INGEST_WORKERS) * 2):
+            submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                filename = in_flight.pop(future)[0]
+                try:
+                    yield future.result() + (None,)
+                except Exception as e:
+                    yield filename, [], e
+                submit_next()
+
+def process_documents(full_rebuild: bool = False):
+    """
+    Brings the vector store in line with RAW_DOCS_PATH. Only files whose
+    content hash changed are re-chunked and re-embedded; chunks of changed
+    and removed files are deleted by ID. Falls back to a full rebuild when
+    there is no manifest yet, when asked to, or when the index type can't
+    delete vectors.
+    """
+    print(f"Starting document processing from '{RAW_DOCS_PATH}'...")
+    current = scan_raw_documents()
+    vector_store = VectorStore(PROCESSED_VECTORS_PATH)
+    manifest = load_manifest()
+
+    if vector_store.db is None or not manifest:
+        full_rebuild = True
+    if full_rebuild:
+        print("  - Doing a full rebuild.")
+        manifest = {}
+
+    changed = [name for name, file_hash in current.items() if manifest.get(name, {}).get("sha256") != file_hash]
+    removed = [name for name in manifest if name not in current]
+    print(f"  - {len(current) - len(changed)} unchanged, {len(changed)} new or changed, {len(removed)} removed.")
+    if not changed and not removed and not full_rebuild:
+        print("✅ Vector store is already up to date.")
+        return
+    if full_rebuild and not current:
         print("No documents found to process. Exiting.")
         return
 
-    print(f"\nLoaded {len(all_docs)} documents.")
-
-    # 2. Split the documents into smaller chunks
-    print("Splitting documents into smaller chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100
-    )
-    
-    all_chunks = []
-    for doc in all_docs:
-        chunks = text_splitter.create_documents(
-            [doc["content"]], 
-            metadatas=[{"source": doc["source"]}]
-        )
-        all_chunks.extend(chunks)
-        print(f"  - Created {len(chunks)} chunks from {doc['source']}")
-
-    print(f"\nTotal chunks created: {len(all_chunks)}")
-
-    # 3. Create and save the vector store
-    print(f"Creating and saving vector store to '{PROCESSED_VECTORS_PATH}'...")
-    vector_store = VectorStore(PROCESSED_VECTORS_PATH)
-    vector_store.build_from_chunks(all_chunks)
-    print("✅ Vector store built and saved successfully!")
+    stale_ids = [chunk_id for name in changed + removed for chunk_id in manifest.get(name, {}).get("chunk_ids", [])]
+    if not full_rebuild and not vector_store.delete_chunks(stale_ids):
+        print("  - Falling back to a full rebuild.")
+        return process_documents(full_rebuild=True)
+
+    for name in removed:
+        manifest.pop(name, None)
+    if full_rebuild:
+        vector_store.clear()
+
+    print(f"Extracting and splitting {len(changed)} documents with {INGEST_WORKERS} worker processes...")
+    started_at = time.perf_counter()
+    embed_seconds = 0.0
+    page_count = 0
+    file_ids = {name: [] for name in changed}
+    failed = set()
+    batch_chunks, batch_ids = [], []
+
+    def flush():
+        nonlocal embed_seconds
+        if batch_chunks:
+            embed_start = time.perf_counter()
+            vector_store.add_chunks(batch_chunks, batch_ids)
+            embed_seconds += time.perf_counter() - embed_start
+            batch_chunks.clear()
+            batch_ids.clear()
+
+    for name, pages, error in stream_pages(changed):
+        if error is not None:
+            print(f"    - Error processing file {name}: {error}")
+            failed.add(name)
+            continue
+        for page_number, texts in pages:
+            page_count += 1
+            for i, text in enumerate(texts):
+                chunk_id = f"{name}:{current[name][:16]}:p{page_number}:{i}"
+                batch_chunks.append(Document(page_content=text, metadata={"source": name, "page": page_number}))
+                batch_ids.append(chunk_id)
+                file_ids[name].append(chunk_id)
+            if len(batch_chunks) >= EMBED_BATCH_SIZE:
+                flush()
+    flush()
+
+    # A file that failed part-way leaves no chunks behind and is retried next run
+    partial_ids = [chunk_id for name in failed for chunk_id in file_ids[name]]
+    if partial_ids and not vector_store.delete_chunks(partial_ids):
+        print("🚨 Could not remove chunks of failed files; the manifest was not updated.")
+        return
+    for name in changed:
+        if name in failed:
+            manifest.pop(name, None)
+        else:
+            manifest[name] = {"sha256": current[name], "chunk_ids": file_ids[name]}
+
+    elapsed = time.perf_counter() - started_at
+    chunk_count = sum(len(file_ids[name]) for name in changed if name not in failed)
+    print(f"\n📈 Ingested {page_count} pages into {chunk_count} chunks in {elapsed:.1f}s "
+          f"({page_count / elapsed if elapsed else 0:.1f} pages/s, {chunk_count / elapsed if elapsed else 0:.1f} chunks/s; "
+          f"embedding took {embed_seconds:.1f}s).")
+
+    if vector_store.db is None:
+        print("No chunks could be created. Exiting.")
+        return
+    if full_rebuild:
+        vector_store.reindex(default_index_config())
+    vector_store.save()
+    save_manifest(manifest)
+    bump_data_version("vector store update")
+    print("✅ Vector store updated and saved successfully!")
 
 
 if __name__ == "__main__":
-    process_documents()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or incrementally update the document vector store.")
+    parser.add_argument("--full", action="store_true", help="Re-chunk and re-embed every document.")
+    process_documents(full_rebuild=parser.parse_args().full)
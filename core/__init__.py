@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# Settings are read from the environment when the core.* modules are imported,
+# and this package is always imported first, so .env is loaded here once.
+load_dotenv()
@@ -0,0 +1,77 @@
+import os
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# --- Configuration ---
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", 5000))
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", 50))
+SQL_MAX_RESULT_BYTES = int(os.getenv("SQL_MAX_RESULT_BYTES", 8000))
+SQL_FETCH_BATCH_SIZE = int(os.getenv("SQL_FETCH_BATCH_SIZE", 100))
+
+def execute_read_only(session: Session, sql: str, params: dict = None,
+                      max_rows: int = SQL_MAX_ROWS, max_bytes: int = SQL_MAX_RESULT_BYTES,
+                      timeout_ms: int = SQL_STATEMENT_TIMEOUT_MS) -> dict:
+    """
+    Runs a query in its own read-only transaction with a statement timeout,
+    streaming rows through a server-side cursor so only the kept rows are ever
+    held in memory.
+
+    At most max_rows rows (and roughly max_bytes of cell text) are kept; the rest
+    are only counted. The count stops at the query's own LIMIT (the validator
+    adds SQL_MAX_ROWS + 1), so total_rows is not the size of the full match.
+    The transaction is always rolled back afterwards, since nothing is written.
+
+    Returns:
+        dict: {"columns": [...], "rows": [tuple, ...], "total_rows": int, "truncated": bool}
+    """
+    # Start from a clean transaction: SET TRANSACTION must be its first statement
+    session.rollback()
+    try:
+        session.execute(text("SET TRANSACTION READ ONLY"))
+        session.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+        result = session.execute(
+            text(sql), params or {},
+            execution_options={"stream_results": True, "max_row_buffer": SQL_FETCH_BATCH_SIZE}
+        )
+        columns = list(result.keys())
+        rows, total_rows, used_bytes = [], 0, 0
+        while True:
+            batch = result.fetchmany(SQL_FETCH_BATCH_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                total_rows += 1
+                if len(rows) >= max_rows:
+                    continue
+                row_bytes = sum(len(str(value)) for value in row)
+                if rows and used_bytes + row_bytes > max_bytes:
+                    max_rows = len(rows)  # Stop keeping rows; just count the rest
+                    continue
+                rows.append(tuple(row))
+                used_bytes += row_bytes
+        result.close()
+        return {"columns": columns, "rows": rows, "total_rows": total_rows, "truncated": total_rows > len(rows)}
+    finally:
+        session.rollback()
+
+def format_result(result: dict, max_cell_chars: int = 500) -> str:
+    """
+    Formats a query result compactly: a scalar as-is, otherwise one header line
+    with the column names followed by one pipe-separated line per row, plus a
+    marker when rows were cut off (without a count, since the LIMIT hides it).
+    """
+    rows = result["rows"]
+    if not rows:
+        return "No data found."
+    if result["total_rows"] == 1 and len(result["columns"]) == 1:
+        return str(rows[0][0])
+
+    def cell(value):
+        value = "" if value is None else str(value).replace("\n", " ")
+        return value if len(value) <= max_cell_chars else value[:max_cell_chars] + "…"
+
+    lines = ["Columns: " + " | ".join(result["columns"])]
+    lines.extend("- " + " | ".join(cell(value) for value in row) for row in rows)
+    if result["truncated"]:
+        lines.append("... (truncated, more rows not shown)")
+    return "\n".join(lines)
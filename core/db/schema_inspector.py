@@ -1,68 +1,138 @@
+import os
+import time
+import threading
 from sqlalchemy import inspect, text
 from .database import engine
+from core.pipeline.data_version import get_data_version
 
-def get_db_schema_for_sql_agent() -> str:
-    """
-    Inspects the database and generates a detailed schema string for the TextToSQL agent.
-    """
-    inspector = inspect(engine)
-    schema_info = []
-    table_names = inspector.get_table_names()
+# --- Configuration ---
+# Safety net for DDL that happens outside the ingestion scripts (which bump the
+# data version themselves).
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL_SECONDS", 600))
 
-    if not table_names:
-        return "No tables found in the database."
+# Define what each table contains
+TABLE_DESCRIPTIONS = {
+    "lecturers": "Contains detailed information about faculty members including: name, role (Professor/Associate Professor/Assistant Professor), education background, experience at PES, teaching subjects, responsibilities, and research interests. Use this for queries about specific lecturers, their qualifications, subjects they teach, research areas, etc.",
+    "clubs": "Contains information about student clubs including: name, category, description/about, founded year, recruitment procedures, recruitment timing, and goals. Use this for queries about student organizations, clubs, activities, etc.",
+    "course": "Contains basic course metadata including: semester, subject name, credits, core/elective status, prerequisites, course codes. For detailed course content, subject descriptions, what is taught in each semester, use VECTOR_SEARCH instead.",
+    "campuses": "Contains basic campus information including: pincode, campus_name, location, infrastructure level. NOTE: Does NOT contain founding/establishment dates - use VECTOR_SEARCH for historical information about university establishment.",
+    "categories": "Contains course category information (category_id, category_name).",
+    "courses": "Contains course offerings (course_id, pincode, category_id, course_name).",
+    "specialization": "Contains specialization information (specialization_id, course_id, specialization_name)."
+}
 
-    for table_name in table_names:
-        columns = inspector.get_columns(table_name)
-        column_details = [f"- {col['name']} ({col['type']})" for col in columns]
-        schema_info.append(f"Table `{table_name}`:\n" + "\n".join(column_details))
-    
-    return "\n\n".join(schema_info)
+# Planner-side estimates straight from the catalog, no table scans. reltuples
+# is -1 (PG14+) or 0 for tables that have never been vacuumed/analyzed.
+ROW_ESTIMATE_QUERY = text(
+    "SELECT c.relname, c.reltuples::bigint FROM pg_class c "
+    "JOIN pg_namespace n ON n.oid = c.relnamespace "
+    "WHERE c.relkind IN ('r', 'p') AND n.nspname = current_schema()"
+)
 
-def get_db_summary_for_planner_agent() -> str:
+class SchemaCatalog:
     """
-    Inspects the database and generates a high-level summary of each table's purpose.
-    This provides detailed information about what data is available for the Planner agent.
+    Reflects the database schema once and caches the rendered schema strings for
+    the TextToSQL and Planner agents. The cache is rebuilt when the data version
+    changes (ingestion/DDL) or after SCHEMA_CACHE_TTL seconds.
     """
-    inspector = inspect(engine)
-    table_names = inspector.get_table_names()
-    
-    if not table_names:
-        return "No tables found in the database."
-    
-    summaries = []
-    
-    # Define what each table contains
-    table_descriptions = {
-        "lecturers": "Contains detailed information about faculty members including: name, role (Professor/Associate Professor/Assistant Professor), education background, experience at PES, teaching subjects, responsibilities, and research interests. Use this for queries about specific lecturers, their qualifications, subjects they teach, research areas, etc.",
-        "clubs": "Contains information about student clubs including: name, category, description/about, founded year, recruitment procedures, recruitment timing, and goals. Use this for queries about student organizations, clubs, activities, etc.",
-        "course": "Contains basic course metadata including: semester, subject name, credits, core/elective status, prerequisites, course codes. For detailed course content, subject descriptions, what is taught in each semester, use VECTOR_SEARCH instead.",
-        "campuses": "Contains basic campus information including: pincode, campus_name, location, infrastructure level. NOTE: Does NOT contain founding/establishment dates - use VECTOR_SEARCH for historical information about university establishment.",
-        "categories": "Contains course category information (category_id, category_name).",
-        "courses": "Contains course offerings (course_id, pincode, category_id, course_name).",
-        "specialization": "Contains specialization information (specialization_id, course_id, specialization_name)."
-    }
-    
-    with engine.connect() as connection:
-        for table_name in table_names:
-            # Get column information for better context
-            columns = inspector.get_columns(table_name)
-            column_names = [col['name'] for col in columns]
-            
+    def __init__(self, engine, ttl_seconds: float = SCHEMA_CACHE_TTL):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._cache = None
+        self._loaded_at = 0.0
+        self._data_version = None
+
+    def _is_stale(self) -> bool:
+        return (
+            self._cache is None
+            or self._data_version != get_data_version()
+            or time.monotonic() - self._loaded_at > self.ttl_seconds
+        )
+
+    def _load(self) -> dict:
+        inspector = inspect(self.engine)
+        tables = {name: inspector.get_columns(name) for name in inspector.get_table_names()}
+
+        row_estimates = {}
+        try:
+            with self.engine.connect() as connection:
+                row_estimates = dict(connection.execute(ROW_ESTIMATE_QUERY).all())
+        except Exception as e:
+            print(f"  - ⚠️ Could not read row estimates: {e}")
+
+        return {
+            "tables": {name: [col["name"] for col in columns] for name, columns in tables.items()},
+            "sql_schema": self._render_sql_schema(tables),
+            "planner_summary": self._render_planner_summary(tables, row_estimates),
+        }
+
+    @staticmethod
+    def _render_sql_schema(tables: dict) -> str:
+        if not tables:
+            return "No tables found in the database."
+        schema_info = []
+        for table_name, columns in tables.items():
+            column_details = [f"- {col['name']} ({col['type']})" for col in columns]
+            schema_info.append(f"Table `{table_name}`:\n" + "\n".join(column_details))
+        return "\n\n".join(schema_info)
+
+    @staticmethod
+    def _render_planner_summary(tables: dict, row_estimates: dict) -> str:
+        if not tables:
+            return "No tables found in the database."
+        summaries = []
+        for table_name, columns in tables.items():
             # Use predefined description or generate from columns
-            if table_name in table_descriptions:
-                description = table_descriptions[table_name]
+            if table_name in TABLE_DESCRIPTIONS:
+                description = TABLE_DESCRIPTIONS[table_name]
+            else:
+                description = f"Contains data with columns: {', '.join(col['name'] for col in columns)}"
+
+            row_estimate = row_estimates.get(table_name)
+            if row_estimate is not None and row_estimate >= 0:
+                description += f" (Currently has about {row_estimate} records)"
             else:
-                description = f"Contains data with columns: {', '.join(column_names)}"
-            
-            # Get approximate row count for context
-            try:
-                count_query = text(f"SELECT COUNT(*) FROM {table_name}")
-                row_count = connection.execute(count_query).scalar()
-                description += f" (Currently has {row_count} records)"
-            except:
                 description += " (Row count unavailable)"
-            
             summaries.append(f"- **{table_name}**: {description}")
-            
-    return "\n".join(summaries)
+        return "\n".join(summaries)
+
+    def _get(self, key: str):
+        with self._lock:
+            if self._is_stale():
+                data_version = get_data_version()
+                print("  - 🗂️ Refreshing cached database schema...")
+                self._cache = self._load()
+                self._loaded_at = time.monotonic()
+                self._data_version = data_version
+            return self._cache[key]
+
+    def get_sql_schema(self) -> str:
+        return self._get("sql_schema")
+
+    def get_planner_summary(self) -> str:
+        return self._get("planner_summary")
+
+    def get_tables(self) -> dict:
+        """Returns {table_name: [column_name, ...]} from the cached reflection."""
+        return self._get("tables")
+
+    def invalidate(self):
+        """Forces the next call to re-reflect the schema."""
+        with self._lock:
+            self._cache = None
+
+schema_catalog = SchemaCatalog(engine)
+
+def get_db_schema_for_sql_agent() -> str:
+    """
+    Returns a detailed schema string for the TextToSQL agent (cached).
+    """
+    return schema_catalog.get_sql_schema()
+
+def get_db_summary_for_planner_agent() -> str:
+    """
+    Returns a high-level summary of each table's purpose for the Planner agent,
+    with estimated row counts (cached).
+    """
+    return schema_catalog.get_planner_summary()
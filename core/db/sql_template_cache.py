@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from core.pipeline.data_version import get_data_version
+
+# --- Configuration ---
+SQL_TEMPLATE_CACHE_ENABLED = os.getenv("SQL_TEMPLATE_CACHE_ENABLED", "true").lower() == "true"
+SQL_TEMPLATE_CACHE_PATH = os.getenv("SQL_TEMPLATE_CACHE_PATH", "data/cache/sql_templates.json")
+SQL_TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("SQL_TEMPLATE_CACHE_MAX_ENTRIES", 1000))
+# Template changes are written at most this often, and on exit
+SQL_TEMPLATE_CACHE_SAVE_INTERVAL = float(os.getenv("SQL_TEMPLATE_CACHE_SAVE_INTERVAL_SECONDS", 30))
+
+# --- Slot Extraction ---
+# Literal "slots" are the parts of a question that vary between otherwise
+# identical questions: quoted strings, proper names, numbers and the roman
+# semester numerals produced by TextToSQLAgent's preprocessing.
+QUOTED_PATTERN = re.compile(r'"([^"]+)"|\'([^\']+)\'')
+TITLED_NAME_PATTERN = re.compile(r"\b(?:Dr|Prof|Mr|Mrs|Ms)\.?\s+([A-Z][\w'-]*\.?(?:\s+[A-Z][\w'-]*\.?)*)")
+CAPITALIZED_PATTERN = re.compile(r"\b[A-Z][\w'-]+(?:\s+[A-Z][\w'-]+)*")
+SEMESTER_ROMAN_PATTERN = re.compile(r"\bsemester\s+([IVX]+)\b", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"\b\d+\b")
+TITLE_WORDS = {"dr", "prof", "mr", "mrs", "ms"}
+
+# --- SQL Literal Scanning ---
+SQL_STRING_PATTERN = re.compile(r"'((?:[^']|'')*)'")
+SQL_NUMBER_PATTERN = re.compile(r"(?<![\w.\"])\d+(?![\w.])")
+# Row bounds are never bound to a slot: a question's "5 members" must not
+# decide how many rows a later "500 members" question may return.
+SQL_ROW_BOUND_PATTERN = re.compile(r"\b(?:limit|offset|fetch\s+(?:first|next))\s*$", re.IGNORECASE)
+
+def extract_slots(query: str):
+    """
+    Splits a question into its literal slots and a normalized form in which the
+    slots are replaced by typed placeholders.
+
+    Returns:
+        tuple[str, list[dict]]: (normalized_form, [{"kind", "value"}, ...])
+    """
+    spans = []
+
+    def claim(start, end, kind, value):
+        if value and not any(s < end and start < e for s, e, _, _ in spans):
+            spans.append((start, end, kind, value.strip()))
+
+    for m in QUOTED_PATTERN.finditer(query):
+        group = 1 if m.group(1) is not None else 2
+        claim(m.start(), m.end(), "QUOTED", m.group(group))
+    for m in TITLED_NAME_PATTERN.finditer(query):
+        claim(m.start(1), m.end(1), "NAME", m.group(1).rstrip("."))
+    for m in SEMESTER_ROMAN_PATTERN.finditer(query):
+        claim(m.start(1), m.end(1), "ROMAN", m.group(1).upper())
+    for m in CAPITALIZED_PATTERN.finditer(query):
+        words = m.group(0).split()
+        start = m.start()
+        # The first word of the question is capitalized for grammar, not as a name
+        if start == len(query) - len(query.lstrip()):
+            if len(words) == 1:
+                continue
+            start += len(words[0]) + 1
+            words = words[1:]
+        if words and words[0].rstrip(".").lower() in TITLE_WORDS:
+            continue
+        claim(start, m.end(), "NAME", " ".join(words))
+    for m in NUMBER_PATTERN.finditer(query):
+        claim(m.start(), m.end(), "NUM", m.group(0))
+
+    spans.sort()
+    slots, parts, cursor = [], [], 0
+    for start, end, kind, value in spans:
+        parts.append(query[cursor:start].lower())
+        parts.append(f" <{kind}> ")
+        slots.append({"kind": kind, "value": value})
+        cursor = end
+    parts.append(query[cursor:].lower())
+    normalized = re.sub(r"[^\w<> ]+", " ", "".join(parts))
+    normalized = re.sub(r"\s+", " ", normalized).strip()
+    return normalized, slots
+
+def _slot_forms(value: str):
+    """The ways a slot value may appear in SQL: whole, or one of its words."""
+    forms = [("*", value)]
+    words = value.split()
+    if len(words) > 1:
+        forms.extend((str(i), w) for i, w in enumerate(words))
+    return forms
+
+def _render_form(value: str, form: str) -> str:
+    if form == "*":
+        return value
+    words = value.split()
+    index = int(form)
+    return words[index] if index < len(words) else None
+
+class SQLTemplateCache:
+    """
+    Caches successfully executed SQL as parameterized templates.
+
+    When SQL produced for a question contains the question's literal slots (a
+    lecturer name, a year, a semester), those literals are turned into bind
+    parameters and the SQL is stored under the question's normalized form. A
+    later question with the same normalized form gets the template back with its
+    own slot values bound, skipping the LLM call entirely.
+
+    The file is rewritten in batches (see flush) via a temp file and rename, so
+    concurrent workers can overwrite each other's templates but never leave a
+    truncated file behind.
+    """
+    def __init__(self, path: str = SQL_TEMPLATE_CACHE_PATH, max_entries: int = SQL_TEMPLATE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "rejected": 0}
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        self.templates, self.data_version = {}, get_data_version()
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("data_version") == self.data_version:
+                self.templates = saved.get("templates", {})
+        except Exception as e:
+            print(f"  - ⚠️ Could not load SQL template cache: {e}")
+
+    def _mark_dirty(self) -> bool:
+        """Records an unsaved change and returns True once a save is due. Call with self._lock held."""
+        self._dirty = True
+        return time.monotonic() - self._last_save >= SQL_TEMPLATE_CACHE_SAVE_INTERVAL
+
+    def flush(self):
+        """Writes pending changes to disk, atomically."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps({"data_version": self.data_version, "templates": self.templates}, indent=2)
+                self._dirty = False
+                self._last_save = time.monotonic()
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except Exception as e:
+                print(f"  - ⚠️ Could not save SQL template cache: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    def _check_data_version(self):
+        if self.data_version != get_data_version():
+            print("  - 🔁 Knowledge base changed. Clearing SQL template cache.")
+            self.templates, self.data_version = {}, get_data_version()
+            self._mark_dirty()
+
+    def _templatize(self, sql: str, slots: list):
+        """
+        Replaces the SQL literals that carry a slot value with bind parameters.
+        Returns (template_sql, params) or None if some slot can't be located, or
+        the same slot value matches more than one literal (we can't tell which
+        one it belongs to); either way the SQL is not safe to reuse for other values.
+        """
+        params, used_slots, pieces, cursor = [], set(), [], 0
+
+        def bind(spec):
+            name = f"tpl_{len(params)}"
+            params.append({"name": name, **spec})
+            return f":{name}"
+
+        def scan_numbers(fragment):
+            def replace(m):
+                if SQL_ROW_BOUND_PATTERN.search(fragment, 0, m.start()):
+                    return m.group(0)
+                for i, slot in enumerate(slots):
+                    if slot["kind"] == "NUM" and slot["value"] == m.group(0):
+                        used_slots.add(i)
+                        return bind({"slot": i, "form": "*", "kind": "int"})
+                return m.group(0)
+            return SQL_NUMBER_PATTERN.sub(replace, fragment)
+
+        for m in SQL_STRING_PATTERN.finditer(sql):
+            pieces.append(scan_numbers(sql[cursor:m.start()]))
+            literal = m.group(1).replace("''", "'")
+            core = literal.strip("%")
+            prefix = literal[:len(literal) - len(literal.lstrip("%"))]
+            suffix = literal[len(literal.rstrip("%")):]
+            replacement = m.group(0)
+            for i, slot in enumerate(slots):
+                match = next((form for form, text in _slot_forms(slot["value"]) if text.lower() == core.lower()), None)
+                if match is not None and core:
+                    used_slots.add(i)
+                    replacement = bind({
+                        "slot": i, "form": match, "kind": "str", "prefix": prefix, "suffix": suffix,
+                        "lower": core.islower() and not _render_form(slot["value"], match).islower(),
+                    })
+                    break
+            pieces.append(replacement)
+            cursor = m.end()
+        pieces.append(scan_numbers(sql[cursor:]))
+
+        if len(used_slots) != len(slots):
+            return None
+        bound = [(spec["slot"], spec["form"]) for spec in params]
+        if len(set(bound)) != len(bound):
+            return None
+        return "".join(pieces), params
+
+    def lookup(self, query: str):
+        """
+        Returns (sql, bind_params) for a cached template matching the question,
+        or None on a miss.
+        """
+        if not SQL_TEMPLATE_CACHE_ENABLED:
+            return None
+        normalized, slots = extract_slots(query)
+        with self._lock:
+            self._check_data_version()
+            template = self.templates.get(normalized)
+            if template is None or template["slot_count"] != len(slots):
+                self.stats["misses"] += 1
+                return None
+
+            bind_params = {}
+            for spec in template["params"]:
+                value = _render_form(slots[spec["slot"]]["value"], spec["form"])
+                if value is None:
+                    self.stats["misses"] += 1
+                    return None
+                if spec["kind"] == "int":
+                    bind_params[spec["name"]] = int(value)
+                else:
+                    value = value.lower() if spec["lower"] else value
+                    bind_params[spec["name"]] = f"{spec['prefix']}{value}{spec['suffix']}"
+            template["last_used"] = time.time()
+            self.stats["hits"] += 1
+            return template["sql"], bind_params
+
+    def store(self, query: str, sql: str):
+        """Stores successfully executed SQL as a template for the question's normalized form."""
+        if not SQL_TEMPLATE_CACHE_ENABLED:
+            return
+        normalized, slots = extract_slots(query)
+        templatized = self._templatize(sql, slots)
+        with self._lock:
+            if templatized is None:
+                self.stats["rejected"] += 1
+                return
+            self._check_data_version()
+            template_sql, params = templatized
+            self.templates[normalized] = {
+                "sql": template_sql, "params": params, "slot_count": len(slots), "last_used": time.time(),
+            }
+            if len(self.templates) > self.max_entries:
+                oldest = min(self.templates, key=lambda k: self.templates[k]["last_used"])
+                del self.templates[oldest]
+            self.stats["stores"] += 1
+            save_due = self._mark_dirty()
+        if save_due:
+            self.flush()
+
+    def invalidate(self, query: str):
+        """Drops the template for a question, e.g. after it failed to execute."""
+        normalized, _ = extract_slots(query)
+        with self._lock:
+            save_due = self.templates.pop(normalized, None) is not None and self._mark_dirty()
+        if save_due:
+            self.flush()
+
+    def snapshot(self) -> dict:
+        """Returns hit/miss counters and the number of stored templates."""
+        with self._lock:
+            return {**self.stats, "size": len(self.templates)}
@@ -0,0 +1,251 @@
+import os
+import re
+import bisect
+import difflib
+
+# --- Configuration ---
+# One row more than the query runner keeps (SQL_MAX_ROWS), so a capped result
+# is still reported as truncated instead of looking complete.
+SQL_DEFAULT_LIMIT = int(os.getenv("SQL_DEFAULT_LIMIT", int(os.getenv("SQL_MAX_ROWS", 50)) + 1))
+FUZZY_CUTOFF = float(os.getenv("SQL_FUZZY_MATCH_CUTOFF", 0.85))
+
+TOKEN_PATTERN = re.compile(
+    r"(?P<string>'(?:[^']|'')*')"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")+\")"
+    r"|(?P<word>[A-Za-z_][\w$]*)"
+    r"|(?P<number>\d+(?:\.\d+)?)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>::|<=|>=|<>|!=|\|\||.)",
+    re.DOTALL,
+)
+
+FORBIDDEN_KEYWORDS = {
+    "insert", "update", "delete", "drop", "alter", "create", "truncate", "grant", "revoke", "merge",
+}
+
+SQL_KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "is", "null", "like", "ilike",
+    "between", "as", "on", "join", "inner", "left", "right", "full", "outer", "cross",
+    "natural", "using", "group", "by", "order", "asc", "desc", "nulls", "first", "last",
+    "having", "limit", "offset", "fetch", "next", "rows", "row", "only", "distinct", "all",
+    "any", "some", "exists", "union", "intersect", "except", "case", "when", "then",
+    "else", "end", "with", "recursive", "true", "false", "cast", "interval", "similar",
+    "to", "escape", "over", "partition", "window", "filter", "within", "lateral", "values",
+    "ties", "unknown", "collate", "at", "time", "zone", "date", "timestamp", "varchar",
+    "text", "integer", "int", "bigint", "numeric", "boolean", "char", "character", "varying",
+    "double", "precision", "real", "array", "current_date", "current_timestamp", "extract",
+    "year", "month", "day", "hour", "minute", "second", "epoch", "for",
+}
+
+FROM_KEYWORDS = {"from", "join"}
+
+
+def _tokenize(sql: str) -> list:
+    return [(m.lastgroup, m.group(0)) for m in TOKEN_PATTERN.finditer(sql)]
+
+
+def _unquote(identifier: str) -> str:
+    if identifier.startswith('"') and identifier.endswith('"'):
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+def _quote_if_needed(name: str) -> str:
+    """PostgreSQL folds unquoted identifiers to lowercase, so anything else needs quotes."""
+    if re.fullmatch(r"[a-z_][a-z0-9_$]*", name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _closest(name: str, candidates) -> str:
+    by_lower = {c.lower(): c for c in candidates}
+    match = difflib.get_close_matches(name.lower(), list(by_lower), n=1, cutoff=FUZZY_CUTOFF)
+    return by_lower[match[0]] if match else None
+
+
+def _has_outer_limit(tokens: list) -> bool:
+    """True if the outermost statement has a LIMIT/FETCH (ones inside subqueries or CTEs don't count)."""
+    depth = 0
+    for kind, value in tokens:
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            depth -= 1
+        elif kind == "word" and depth == 0 and value.lower() in ("limit", "fetch"):
+            return True
+    return False
+
+
+def _quote_spaced_columns(sql: str, tables: dict, repairs: list) -> str:
+    """Wraps unquoted multi-word column names (e.g. Course Name) in double quotes."""
+    spaced = {col for cols in tables.values() for col in cols if " " in col}
+    if not spaced:
+        return sql
+    segments, buffer = [], ""
+    for kind, value in _tokenize(sql):
+        if kind in ("string", "quoted"):
+            segments.append(("code", buffer))
+            segments.append(("literal", value))
+            buffer = ""
+        else:
+            buffer += value
+    segments.append(("code", buffer))
+
+    for col in sorted(spaced, key=len, reverse=True):
+        pattern = re.compile(r"(?<![\w\"])" + r"\s+".join(map(re.escape, col.split())) + r"(?![\w\"])", re.IGNORECASE)
+        for i, (kind, value) in enumerate(segments):
+            if kind == "code" and pattern.search(value):
+                segments[i] = (kind, pattern.sub(_quote_if_needed(col), value))
+                repairs.append(f"quoted column '{col}'")
+    return "".join(value for _, value in segments)
+
+
+def validate_and_repair(sql: str, tables: dict, default_limit: int = SQL_DEFAULT_LIMIT):
+    """
+    Checks generated SQL against the cached schema without touching the database
+    and fixes mistakes that have a single obvious correction.
+
+    Repairs: misspelled table/column names (fuzzy match), unquoted identifiers
+    that contain spaces or capitals, a missing LIMIT. Errors: anything other than
+    one read-only SELECT statement, and tables that match nothing in the schema.
+
+    Args:
+        sql (str): The SQL produced by the LLM.
+        tables (dict): {table_name: [column_name, ...]} from the schema catalog.
+        default_limit (int): LIMIT appended when the query has none.
+
+    Returns:
+        tuple[str, list[str], str | None]: (repaired_sql, repairs_made, error).
+        When error is set the SQL must not be executed.
+    """
+    repairs = []
+    sql = sql.strip()
+    while sql.endswith(";"):
+        sql = sql[:-1].rstrip()
+
+    tokens = _tokenize(sql)
+    words = [value.lower() for kind, value in tokens if kind == "word"]
+    if not words or words[0] not in ("select", "with"):
+        return sql, repairs, "Only a single SELECT statement is allowed."
+    if any(kind == "other" and value == ";" for kind, value in tokens):
+        return sql, repairs, "Only a single SQL statement is allowed."
+    forbidden = FORBIDDEN_KEYWORDS.intersection(words)
+    if forbidden:
+        return sql, repairs, f"Only read-only SELECT statements are allowed (found {', '.join(sorted(forbidden)).upper()})."
+
+    if not tables:
+        return sql, repairs, None
+
+    sql = _quote_spaced_columns(sql, tables, repairs)
+    tokens = _tokenize(sql)
+    table_by_lower = {name.lower(): name for name in tables}
+    significant = [i for i, (kind, _) in enumerate(tokens) if kind != "space"]
+
+    def next_significant(pos):
+        i = bisect.bisect_right(significant, pos)
+        return significant[i] if i < len(significant) else None
+
+    def prev_significant(pos):
+        i = bisect.bisect_left(significant, pos)
+        return significant[i - 1] if i > 0 else None
+
+    # --- Pass 1: tables, CTE names and aliases ---
+    cte_names, aliases, referenced = set(), {}, []
+    for pos in significant:
+        kind, value = tokens[pos]
+        if kind == "word" and value.lower() == "as":
+            before, after = prev_significant(pos), next_significant(pos)
+            if after is not None and tokens[after][1] == "(" and before is not None:
+                cte_names.add(_unquote(tokens[before][1]).lower())
+            elif after is not None and tokens[after][0] in ("word", "quoted"):
+                aliases.setdefault(_unquote(tokens[after][1]).lower(), None)
+
+    for pos in significant:
+        kind, value = tokens[pos]
+        if kind != "word" or value.lower() not in FROM_KEYWORDS:
+            continue
+        table_pos = next_significant(pos)
+        if table_pos is None or tokens[table_pos][0] not in ("word", "quoted"):
+            continue
+        after = next_significant(table_pos)
+        if after is not None and tokens[after][1] in (".", "("):
+            continue  # schema-qualified name or a set-returning function
+        name = _unquote(tokens[table_pos][1])
+        if name.lower() in cte_names:
+            continue
+        actual = name if name in tables else table_by_lower.get(name.lower())
+        if actual is None:
+            actual = _closest(name, tables)
+            if actual is None:
+                return sql, repairs, (
+                    f"Table '{name}' does not exist. Available tables: {', '.join(sorted(tables))}."
+                )
+            repairs.append(f"table '{name}' -> '{actual}'")
+        tokens[table_pos] = ("quoted" if _quote_if_needed(actual).startswith('"') else "word", _quote_if_needed(actual))
+        referenced.append(actual)
+        aliases[actual.lower()] = actual
+
+        alias_pos = next_significant(table_pos)
+        if alias_pos is not None and tokens[alias_pos][1].lower() == "as":
+            alias_pos = next_significant(alias_pos)
+        if alias_pos is not None and tokens[alias_pos][0] in ("word", "quoted"):
+            alias = _unquote(tokens[alias_pos][1])
+            if alias.lower() not in SQL_KEYWORDS:
+                aliases[alias.lower()] = actual
+
+    if not referenced:
+        return "".join(value for _, value in tokens), repairs, None
+
+    # --- Pass 2: columns ---
+    referenced_columns = {col for table in referenced for col in tables[table]}
+    column_by_lower = {col.lower(): col for col in referenced_columns}
+    known_lower = set(column_by_lower) | set(aliases) | cte_names | SQL_KEYWORDS
+
+    for pos in significant:
+        kind, value = tokens[pos]
+        if kind not in ("word", "quoted"):
+            continue
+        before, after = prev_significant(pos), next_significant(pos)
+        if after is not None and tokens[after][1] in ("(", "."):
+            continue  # function call or qualifier
+        if before is not None and tokens[before][1].lower() in ("as", "from", "join", "::"):
+            continue
+
+        name = _unquote(value)
+        qualifier = None
+        if before is not None and tokens[before][1] == ".":
+            qualifier_pos = prev_significant(before)
+            qualifier = aliases.get(_unquote(tokens[qualifier_pos][1]).lower()) if qualifier_pos is not None else None
+            candidates = tables.get(qualifier, []) if qualifier else []
+            if not candidates:
+                continue
+        else:
+            if name.lower() in known_lower or (kind == "word" and name.lower() in table_by_lower):
+                actual = column_by_lower.get(name.lower())
+                if actual is not None and kind == "word" and _quote_if_needed(actual).startswith('"'):
+                    tokens[pos] = ("quoted", _quote_if_needed(actual))
+                    repairs.append(f"quoted column '{actual}'")
+                elif actual is not None and kind == "quoted" and actual != name:
+                    # Quoted identifiers are case-sensitive
+                    tokens[pos] = ("quoted" if _quote_if_needed(actual).startswith('"') else "word", _quote_if_needed(actual))
+                    repairs.append(f"column '{name}' -> '{actual}'")
+                continue
+            candidates = referenced_columns
+
+        if name in candidates:
+            continue
+        actual = next((c for c in candidates if c.lower() == name.lower()), None) or _closest(name, candidates)
+        if actual is None:
+            continue  # leave it to the database rather than guess
+        if actual != name:
+            repairs.append(f"column '{name}' -> '{actual}'")
+        tokens[pos] = ("quoted", _quote_if_needed(actual))
+
+    sql = "".join(value for _, value in tokens)
+
+    # --- Pass 3: bound the result size ---
+    if default_limit and not _has_outer_limit(_tokenize(sql)):
+        sql = f"{sql} LIMIT {default_limit}"
+        repairs.append(f"added LIMIT {default_limit}")
+
+    return sql, repairs, None
@@ -0,0 +1,81 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+    pass
+
+class CircuitBreaker:
+    """
+    A per-provider circuit breaker.
+
+    - closed: calls go through; consecutive failures are counted.
+    - open: after failure_threshold consecutive failures, calls are rejected
+      immediately for cooldown_seconds.
+    - half_open: after the cool-down a single trial call is let through. Success
+      closes the circuit again, failure re-opens it for another cool-down.
+    """
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown_seconds: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.total_rejections = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Returns True if a call may proceed, moving open -> half_open when the cool-down is over."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = HALF_OPEN
+                print(f"  - 🟡 Circuit for '{self.name}' is half-open. Sending a trial request...")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.total_rejections += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"  - 🟢 Circuit for '{self.name}' closed again.")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"  - 🔴 Circuit for '{self.name}' opened after {self.consecutive_failures} failure(s).")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Frees the half-open trial slot when a call is cancelled without an outcome."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        """Returns the breaker state for monitoring."""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown_seconds - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_rejections": self.total_rejections,
+                "retry_in_seconds": retry_in,
+            }
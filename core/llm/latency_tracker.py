@@ -0,0 +1,44 @@
+import threading
+from collections import deque
+
+class LatencyTracker:
+    """
+    Keeps a rolling window of recent call latencies per (role, provider) and
+    answers percentile queries over it. Thread-safe.
+    """
+    def __init__(self, window_size: int = 200):
+        self.window_size = window_size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, role: str, provider: str, seconds: float):
+        with self._lock:
+            key = (role, provider)
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window_size)
+            self._samples[key].append(seconds)
+
+    def percentile(self, role: str, provider: str, pct: float, min_samples: int = 1):
+        """
+        Returns the pct-th percentile latency in seconds, or None if fewer than
+        min_samples calls have been recorded for this role and provider.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get((role, provider), ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> dict:
+        """Returns sample counts and p50/p95 per 'role/provider' for monitoring."""
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            f"{role}/{provider}": {
+                "count": len(self._samples[(role, provider)]),
+                "p50": self.percentile(role, provider, 50),
+                "p95": self.percentile(role, provider, 95),
+            }
+            for role, provider in keys
+        }
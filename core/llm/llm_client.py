@@ -1,9 +1,19 @@
 import os
-import requests
 import json
+import asyncio
+import contextvars
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+import httpx
 import google.generativeai as genai
 from dotenv import load_dotenv
+from core.llm.latency_tracker import LatencyTracker
+from core.llm.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.llm.response_cache import ResponseCache
 
 # --- Load Configuration ---
 load_dotenv()
@@ -23,25 +33,107 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL_NAME")
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
 TIMEOUT = int(os.getenv("LLM_TIMEOUT_SECONDS", 45))
 
+# Maximum in-flight requests per provider (a local Ollama can't take many)
+PROVIDER_CONCURRENCY = {
+    "google": int(os.getenv("GOOGLE_MAX_CONCURRENCY", 8)),
+    "anthropic": int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", 8)),
+    "ollama": int(os.getenv("OLLAMA_MAX_CONCURRENCY", 2)),
+}
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20))
+
+# Hedging: once the primary is slower than its usual LLM_HEDGE_PERCENTILE
+# latency (tracked per role and provider), the fallback is fired as well and
+# the first good answer wins. Until enough samples exist, a fixed delay is used.
+HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", 10))
+
+# Circuit breaker: after this many consecutive failures a provider is skipped
+# (calls go straight to the fallback) until the cool-down has passed.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 3))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", 30))
+
+# Response cache: only roles listed here are cached (their output depends only
+# on the prompt, unlike the conversational synthesizer).
+CACHE_ROLES = {r.strip().upper() for r in os.getenv("LLM_CACHE_ROLES", "PLANNER,TEXT_TO_SQL").split(",") if r.strip()}
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite3")
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_SECONDS", 86400))
+CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 512))
+CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", 10000))
+
 # --- Configure APIs ---
 if GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# --- Shared Event Loop & Connection Pools ---
+# All provider I/O runs on one background event loop, so the pooled HTTP
+# client and the Gemini async transport are created once and reused by every
+# caller, whether it is sync (agents on worker threads) or async.
+
+_loop = None
+_loop_lock = threading.Lock()
+_http_client = None
+_semaphores = {}
+latency_tracker = LatencyTracker()
+response_cache = ResponseCache(CACHE_PATH, CACHE_TTL, CACHE_MEMORY_ENTRIES, CACHE_DISK_ENTRIES)
+# SQLite reads/commits run here, never on the shared loop where they'd stall every request
+_cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache")
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the background event loop, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client-loop", daemon=True).start()
+    return _loop
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Returns the keep-alive HTTP client shared by the Anthropic and Ollama calls."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+        )
+    return _http_client
+
+def _cache_io(func, *args) -> asyncio.Future:
+    """Runs a response-cache call on the cache thread. Must be called on the background loop."""
+    return asyncio.get_running_loop().run_in_executor(_cache_executor, func, *args)
+
+def _get_semaphore(provider: str) -> asyncio.Semaphore:
+    if provider not in _semaphores:
+        _semaphores[provider] = asyncio.Semaphore(PROVIDER_CONCURRENCY.get(provider, 4))
+    return _semaphores[provider]
+
+@lru_cache(maxsize=None)
+def _get_google_model(model_name: str):
+    return genai.GenerativeModel(model_name)
+
 # --- Internal Helper Functions ---
 
-def _call_google_api(prompt: str) -> str:
+async def _call_google_api(prompt: str) -> str:
     """Calls the Google Gemini API."""
     if not GOOGLE_API_KEY: raise ValueError("GOOGLE_API_KEY not configured.")
     print(f"  - 📞 Calling Google Gemini API ({GOOGLE_MODEL})...")
-    model = genai.GenerativeModel(GOOGLE_MODEL)
-    response = model.generate_content(prompt)
+    model = _get_google_model(GOOGLE_MODEL)
+    response = await model.generate_content_async(prompt)
     return response.text.strip()
 
-def _call_anthropic_api(prompt: str) -> str:
+async def _call_anthropic_api(prompt: str) -> str:
     """Calls the Anthropic Claude API."""
     if not ANTHROPIC_API_KEY: raise ValueError("ANTHROPIC_API_KEY not configured.")
     print(f"  - 📞 Calling Anthropic Claude API ({ANTHROPIC_MODEL})...")
-    response = requests.post(
+    response = await _get_http_client().post(
         "https://api.anthropic.com/v1/messages",
         headers={
             "x-api-key": ANTHROPIC_API_KEY,
@@ -52,51 +144,407 @@ def _call_anthropic_api(prompt: str) -> str:
             "model": ANTHROPIC_MODEL,
             "max_tokens": 4000,
             "messages": [{"role": "user", "content": prompt}]
-        },
-        timeout=TIMEOUT
+        }
     )
     response.raise_for_status()
     return response.json()['content'][0]['text'].strip()
 
-def _call_ollama_api(prompt: str) -> str:
+async def _call_ollama_api(prompt: str) -> str:
     """Calls the local Ollama API with a timeout."""
     if not OLLAMA_BASE_URL or not OLLAMA_MODEL: raise ValueError("Ollama URL or model name not configured.")
     print(f"  - 📞 Calling local Ollama model '{OLLAMA_MODEL}' (timeout: {TIMEOUT}s)...")
-    response = requests.post(
+    response = await _get_http_client().post(
         f"{OLLAMA_BASE_URL}/api/generate",
-        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False},
-        timeout=TIMEOUT
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False}
     )
     response.raise_for_status()
     return json.loads(response.text)['response'].strip()
 
-# --- Main Public Function ---
+# --- Streaming Helper Functions ---
 
-def generate_response(prompt: str, role: str) -> str:
-    """Generates a response using the primary LLM provider, with a fallback."""
-    provider_map = {
-        "google": _call_google_api,
-        "anthropic": _call_anthropic_api,
-        "ollama": _call_ollama_api
-    }
-    primary_call = provider_map.get(PRIMARY_PROVIDER)
-    fallback_call = provider_map.get(FALLBACK_PROVIDER, _call_google_api)
-    
-    if not primary_call:
+async def _stream_google_api(prompt: str):
+    """Streams text deltas from the Google Gemini API."""
+    if not GOOGLE_API_KEY: raise ValueError("GOOGLE_API_KEY not configured.")
+    print(f"  - 📞 Streaming from Google Gemini API ({GOOGLE_MODEL})...")
+    model = _get_google_model(GOOGLE_MODEL)
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+async def _stream_anthropic_api(prompt: str):
+    """Streams text deltas from the Anthropic Claude API (server-sent events)."""
+    if not ANTHROPIC_API_KEY: raise ValueError("ANTHROPIC_API_KEY not configured.")
+    print(f"  - 📞 Streaming from Anthropic Claude API ({ANTHROPIC_MODEL})...")
+    async with _get_http_client().stream(
+        "POST",
+        "https://api.anthropic.com/v1/messages",
+        headers={
+            "x-api-key": ANTHROPIC_API_KEY,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        },
+        json={
+            "model": ANTHROPIC_MODEL,
+            "max_tokens": 4000,
+            "stream": True,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[len("data:"):].strip())
+            if event.get("type") == "content_block_delta":
+                text = event.get("delta", {}).get("text")
+                if text:
+                    yield text
+            elif event.get("type") == "error":
+                raise RuntimeError(event.get("error", {}).get("message", "Anthropic stream error"))
+
+async def _stream_ollama_api(prompt: str):
+    """Streams text deltas from the local Ollama API (newline-delimited JSON)."""
+    if not OLLAMA_BASE_URL or not OLLAMA_MODEL: raise ValueError("Ollama URL or model name not configured.")
+    print(f"  - 📞 Streaming from local Ollama model '{OLLAMA_MODEL}'...")
+    async with _get_http_client().stream(
+        "POST",
+        f"{OLLAMA_BASE_URL}/api/generate",
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": True}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event.get("response"):
+                yield event["response"]
+            if event.get("done"):
+                break
+
+PROVIDER_STREAMS = {
+    "google": _stream_google_api,
+    "anthropic": _stream_anthropic_api,
+    "ollama": _stream_ollama_api
+}
+
+PROVIDER_CALLS = {
+    "google": _call_google_api,
+    "anthropic": _call_anthropic_api,
+    "ollama": _call_ollama_api
+}
+
+PROVIDER_MODELS = {
+    "google": GOOGLE_MODEL,
+    "anthropic": ANTHROPIC_MODEL,
+    "ollama": OLLAMA_MODEL
+}
+
+circuit_breakers = {
+    provider: CircuitBreaker(provider, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+    for provider in PROVIDER_CALLS
+}
+
+def _record_round_trip(counter: dict, role: str):
+    # Only runs on the background loop, so no locking is needed
+    if counter is not None:
+        counter["total"] += 1
+        counter["by_role"][role.upper()] = counter["by_role"].get(role.upper(), 0) + 1
+
+async def _call_provider(provider: str, prompt: str, role: str, counter: dict = None) -> str:
+    """
+    Calls a provider while holding its concurrency slot, recording its latency
+    and the outcome on its circuit breaker, and counting the request as a round
+    trip. Raises CircuitOpenError without calling out if the provider's circuit
+    is open.
+    """
+    breaker = circuit_breakers[provider]
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit for provider '{provider}' is open.")
+    try:
+        async with _get_semaphore(provider):
+            _record_round_trip(counter, role)
+            start = time.perf_counter()
+            result = await PROVIDER_CALLS[provider](prompt)
+            latency_tracker.record(role, provider, time.perf_counter() - start)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+def _hedge_delay(role: str, provider: str) -> float:
+    """How long to wait on the primary before also firing the fallback."""
+    delay = latency_tracker.percentile(role, provider, HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES)
+    return HEDGE_DEFAULT_DELAY if delay is None else delay
+
+async def _hedged_call(primary: str, fallback: str, prompt: str, role: str, counter: dict = None) -> tuple:
+    """
+    Starts the primary, and if it hasn't answered within the hedge delay starts
+    the fallback too. Returns (provider, answer) for the first successful answer
+    and cancels the other call. Raises the last error if both fail.
+    """
+    primary_task = asyncio.create_task(_call_provider(primary, prompt, role, counter))
+    done, _ = await asyncio.wait({primary_task}, timeout=_hedge_delay(role, primary))
+    if done and primary_task.exception() is None:
+        return primary, primary_task.result()
+    if done:
+        print(f"  - ⚠️ Primary provider '{primary}' failed: {primary_task.exception()}")
+        print(f"  - 🔄 Switching to fallback provider '{fallback}'...")
+        return fallback, await _call_provider(fallback, prompt, role, counter)
+
+    print(f"  - ⏱️ Primary provider '{primary}' is slow for role {role}. Hedging with '{fallback}'...")
+    fallback_task = asyncio.create_task(_call_provider(fallback, prompt, role, counter))
+    providers = {primary_task: primary, fallback_task: fallback}
+    pending = {primary_task, fallback_task}
+    last_error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return providers[task], task.result()
+                last_error = task.exception()
+                print(f"  - ⚠️ Hedged call failed: {last_error}")
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def _generate(prompt: str, role: str, counter: dict = None) -> str:
+    """Cached generation for the opted-in roles. Must run on the background loop."""
+    if role.upper() not in CACHE_ROLES:
+        return (await _generate_uncached(prompt, role, counter))[1]
+
+    provider = PRIMARY_PROVIDER if PRIMARY_PROVIDER in PROVIDER_CALLS else "google"
+    key = ResponseCache.make_key(provider, PROVIDER_MODELS.get(provider), role.upper(), prompt)
+    cached = await _cache_io(response_cache.get, key)
+    if cached is not None:
+        print(f"  - 💾 LLM cache hit for role {role}.")
+        return cached
+
+    answered_by, response = await _generate_uncached(prompt, role, counter)
+    # Lookups are keyed by the primary, so only its answers are cached (failures
+    # come back with no provider). The write isn't awaited.
+    if answered_by == provider:
+        _cache_io(response_cache.set, key, role.upper(), response)
+    return response
+
+async def _generate_uncached(prompt: str, role: str, counter: dict = None) -> tuple:
+    """
+    Primary-then-fallback generation. Returns (provider, answer); provider is
+    None when every provider failed and the answer is an "Error: ..." string.
+    Must run on the background loop.
+    """
+    primary = PRIMARY_PROVIDER
+    fallback = FALLBACK_PROVIDER if FALLBACK_PROVIDER in PROVIDER_CALLS else "google"
+
+    if primary not in PROVIDER_CALLS:
         print(f"  - ⚠️ Unknown PRIMARY_LLM_PROVIDER '{PRIMARY_PROVIDER}'. Defaulting to Google.")
-        primary_call = _call_google_api
+        primary = "google"
+
+    if HEDGING_ENABLED and primary != fallback:
+        try:
+            return await _hedged_call(primary, fallback, prompt, role, counter)
+        except Exception as e:
+            print(f"  - ❌ Primary and fallback providers both failed: {e}")
+            return None, f"Error: Both the primary and fallback AI models failed to respond. Details: {e}"
 
     try:
-        return primary_call(prompt)
+        return primary, await _call_provider(primary, prompt, role, counter)
     except Exception as e:
         print(f"  - ⚠️ Primary provider '{PRIMARY_PROVIDER}' failed: {e}")
         if PRIMARY_PROVIDER == FALLBACK_PROVIDER:
-            return f"Error: The primary provider '{PRIMARY_PROVIDER}' failed and it is also the fallback. Error: {e}"
-        
+            return None, f"Error: The primary provider '{PRIMARY_PROVIDER}' failed and it is also the fallback. Error: {e}"
+
         print(f"  - 🔄 Switching to fallback provider '{FALLBACK_PROVIDER}'...")
         try:
-            return fallback_call(prompt)
+            return fallback, await _call_provider(fallback, prompt, role, counter)
         except Exception as fallback_e:
             error_message = f"  - ❌ Fallback provider also failed: {fallback_e}"
             print(error_message)
-            return f"Error: Both the primary and fallback AI models failed to respond. Details: {fallback_e}"
\ No newline at end of file
+            return None, f"Error: Both the primary and fallback AI models failed to respond. Details: {fallback_e}"
+
+async def _stream_provider(provider: str, prompt: str, role: str, counter: dict = None):
+    """
+    Streams from a provider while holding its concurrency slot, updating its
+    circuit breaker and counting the request as a round trip.
+    """
+    breaker = circuit_breakers[provider]
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit for provider '{provider}' is open.")
+    try:
+        async with _get_semaphore(provider):
+            _record_round_trip(counter, role)
+            async for delta in PROVIDER_STREAMS[provider](prompt):
+                yield delta
+    except (asyncio.CancelledError, GeneratorExit):
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+
+async def _stream(prompt: str, role: str, counter: dict = None):
+    """
+    Streams from the primary provider, switching to the fallback only if the
+    primary fails before producing any text (a half-written answer can't be
+    retried transparently). Must run on the background loop.
+    """
+    primary = PRIMARY_PROVIDER if PRIMARY_PROVIDER in PROVIDER_CALLS else "google"
+    fallback = FALLBACK_PROVIDER if FALLBACK_PROVIDER in PROVIDER_CALLS else "google"
+
+    cache_key = None
+    if role.upper() in CACHE_ROLES:
+        cache_key = ResponseCache.make_key(primary, PROVIDER_MODELS.get(primary), role.upper(), prompt)
+        cached = await _cache_io(response_cache.get, cache_key)
+        if cached is not None:
+            print(f"  - 💾 LLM cache hit for role {role}.")
+            yield cached
+            return
+
+    providers = [primary] if primary == fallback else [primary, fallback]
+    parts = []
+    answered_by = None
+    for provider in providers:
+        try:
+            async for delta in _stream_provider(provider, prompt, role, counter):
+                parts.append(delta)
+                yield delta
+            answered_by = provider
+            break
+        except Exception as e:
+            if parts:
+                print(f"  - ❌ Provider '{provider}' failed mid-stream: {e}")
+                yield f"\n\n[Error: the answer was interrupted. Details: {e}]"
+                return
+            print(f"  - ⚠️ Streaming from provider '{provider}' failed: {e}")
+            if provider == providers[-1]:
+                yield f"Error: Both the primary and fallback AI models failed to respond. Details: {e}"
+                return
+            print(f"  - 🔄 Switching to fallback provider '{fallback}'...")
+
+    # Keyed by the primary, so a fallback's answer isn't cached under its name
+    if cache_key is not None and answered_by == primary:
+        _cache_io(response_cache.set, cache_key, role.upper(), "".join(parts).strip())
+
+# --- Main Public Functions ---
+
+# Per-query accounting of requests actually sent to a provider: a fallback or
+# hedged request counts separately, a cache hit or open circuit not at all
+_round_trip_counter = contextvars.ContextVar("llm_round_trip_counter", default=None)
+
+@contextmanager
+def count_round_trips():
+    """
+    Counts the LLM round trips made by the current thread (and by plan-step
+    threads started with a copy of its context) inside the block. Yields a
+    {"total", "by_role"} dict; nested blocks share the outermost counter.
+    """
+    counter = _round_trip_counter.get()
+    if counter is not None:
+        yield counter
+        return
+    counter = {"total": 0, "by_role": {}}
+    token = _round_trip_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _round_trip_counter.reset(token)
+
+def get_cache_stats() -> dict:
+    """Returns the LLM response cache hit/miss counters."""
+    return response_cache.snapshot()
+
+def get_circuit_breaker_states() -> dict:
+    """Returns the circuit breaker state of every provider, for monitoring."""
+    return {provider: breaker.snapshot() for provider, breaker in circuit_breakers.items()}
+
+async def agenerate_response(prompt: str, role: str) -> str:
+    """
+    Async version of generate_response. Safe to await from any event loop; the
+    provider call itself always runs on the client's own loop so the pooled
+    connections are reused.
+    """
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    counter = _round_trip_counter.get()
+    if running is loop:
+        return await _generate(prompt, role, counter)
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_generate(prompt, role, counter), loop))
+
+def generate_response(prompt: str, role: str) -> str:
+    """Generates a response using the primary LLM provider, with a fallback."""
+    return asyncio.run_coroutine_threadsafe(_generate(prompt, role, _round_trip_counter.get()), _get_loop()).result()
+
+async def astream_response(prompt: str, role: str):
+    """
+    Async generator of text deltas for the prompt, with the same provider
+    fallback rules as agenerate_response. Safe to iterate from any event loop.
+    An error that ends the stream early is re-raised to the caller, so it can't
+    be mistaken for a complete answer.
+    """
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    counter = _round_trip_counter.get()
+    if running is loop:
+        async for delta in _stream(prompt, role, counter):
+            yield delta
+        return
+
+    # Bridge: the stream runs on the client loop and feeds the caller's loop
+    deltas = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for delta in _stream(prompt, role, counter):
+                running.call_soon_threadsafe(deltas.put_nowait, delta)
+        except Exception as e:
+            running.call_soon_threadsafe(deltas.put_nowait, e)
+        finally:
+            running.call_soon_threadsafe(deltas.put_nowait, done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while (delta := await deltas.get()) is not done:
+            if isinstance(delta, Exception):
+                raise delta
+            yield delta
+    finally:
+        future.cancel()
+
+def stream_response(prompt: str, role: str):
+    """Sync generator of text deltas for the prompt (see astream_response)."""
+    deltas = queue.Queue()
+    done = object()
+    counter = _round_trip_counter.get()
+
+    async def pump():
+        try:
+            async for delta in _stream(prompt, role, counter):
+                deltas.put(delta)
+        except Exception as e:
+            deltas.put(e)
+        finally:
+            deltas.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _get_loop())
+    try:
+        while (delta := deltas.get()) is not done:
+            if isinstance(delta, Exception):
+                raise delta
+            yield delta
+    finally:
+        # Stops the provider call if the consumer goes away early
+        future.cancel()
@@ -0,0 +1,120 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """
+    A two-tier, content-addressed cache for LLM responses.
+
+    Entries are keyed by a SHA-256 of (provider, model, role, prompt). Lookups
+    hit an in-memory LRU first and a persistent SQLite table second; both tiers
+    honour the TTL and are size-bounded (the memory tier evicts the least
+    recently used entry, the disk tier the oldest write). Lookups never write
+    to SQLite; expired rows are cleaned up by set().
+    """
+    def __init__(self, db_path: str, ttl_seconds: float = 86400, memory_entries: int = 512, disk_entries: int = 10000):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(provider: str, model: str, role: str, prompt: str) -> str:
+        payload = "\x1f".join([provider or "", model or "", role or "", prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, role TEXT, response TEXT, created_at REAL, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str):
+        """Returns the cached response or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            try:
+                conn = self._get_conn()
+                row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] < self.ttl_seconds:
+                    self._remember(key, row[0], row[1])
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+            except sqlite3.Error as e:
+                print(f"  - ⚠️ LLM cache lookup failed: {e}")
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, role: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self.stats["stores"] += 1
+            try:
+                conn = self._get_conn()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, role, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, role, response, now, now)
+                )
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                evicted = conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_entries,)
+                ).rowcount
+                self.stats["evictions"] += max(0, evicted)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"  - ⚠️ LLM cache write failed: {e}")
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        """Drops every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            try:
+                conn = self._get_conn()
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"  - ⚠️ LLM cache clear failed: {e}")
+
+    def snapshot(self) -> dict:
+        """Returns hit/miss counters and the current memory tier size."""
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = lookups - self.stats["misses"]
+            return {
+                **self.stats,
+                "memory_size": len(self._memory),
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,236 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from agents.planner import PlannerAgent
+from agents.text_to_sql import TextToSQLAgent
+from agents.retriever_agent import RetrieverAgent
+from agents.reasoner import ReasonerAgent
+from agents.synthesizer import SynthesizerAgent
+from core.rag.vector_store import VectorStore
+from core.db.database import get_db
+from core.pipeline.plan_executor import PlanExecutor
+from core.pipeline.semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
+from core.pipeline.query_router import QueryRouter, FAST_ROUTER_ENABLED
+from core.pipeline.speculative_retrieval import SpeculativeRetriever, SPECULATIVE_RETRIEVAL_ENABLED
+from core.pipeline.context_assembler import ContextAssembler
+from core.pipeline.answer_stream import AnswerStream
+from core.pipeline.answer_renderer import render_answer, TEMPLATE_ANSWERS_ENABLED
+from core.llm.llm_client import count_round_trips
+
+def build_agents() -> dict:
+    """Creates the agents and shared services used by every pipeline run."""
+    print("🚀 Initializing Agents and Services...")
+    db_session = next(get_db())
+    vector_store = VectorStore("data/documents/processed")
+
+    agents = {
+        "planner": PlannerAgent(),
+        "text_to_sql": TextToSQLAgent(db_session),
+        "retriever": RetrieverAgent(vector_store),
+        "reasoner": ReasonerAgent(),
+        "synthesizer": SynthesizerAgent()
+    }
+    if SEMANTIC_CACHE_ENABLED:
+        # Reuses the already-loaded MiniLM model (and its query-embedding cache)
+        agents["semantic_cache"] = SemanticCache(vector_store.query_embeddings)
+    if FAST_ROUTER_ENABLED:
+        agents["router"] = QueryRouter(vector_store.query_embeddings)
+    if SPECULATIVE_RETRIEVAL_ENABLED:
+        agents["speculative_retriever"] = SpeculativeRetriever(agents["retriever"], vector_store.query_embeddings)
+    print("✅ Agents and Services Initialized.")
+    return agents
+
+def execute_rag_pipeline(query: str, agents: dict, retrieved_chunks: list = None) -> str:
+    print(f"  - Executing RAG pipeline for: '{query}'")
+    if retrieved_chunks is None:
+        retrieved_chunks = agents["retriever"].process(query)
+    if not retrieved_chunks:
+        return "No relevant information found in documents."
+    refined_context = agents["reasoner"].process(query, retrieved_chunks)
+    return refined_context
+
+def _prefetch_vector_searches(queries: list, agents: dict, speculation=None) -> dict:
+    """
+    Searches several VECTOR_SEARCH sub_queries in one batch and returns
+    {sub_query: chunks}. Sub_queries the speculative search already covers
+    reuse its chunks instead of being searched again.
+    """
+    chunks_by_query = {}
+    if speculation:
+        for query in queries:
+            chunks = speculation.claim(query)
+            if chunks is not None:
+                chunks_by_query[query] = chunks
+    remaining = [query for query in queries if query not in chunks_by_query]
+    if remaining:
+        chunks_by_query.update(zip(remaining, agents["retriever"].process_many(remaining)))
+    return chunks_by_query
+
+def iter_pipeline_events(user_query: str, agents: dict, stream: bool = False):
+    """
+    Runs planner -> plan execution -> synthesizer and yields typed event dicts:
+    - {"type": "status", "message"}
+    - {"type": "plan", "plan"}
+    - {"type": "step_started", "step", "thought", "tool", "sub_query"}
+    - {"type": "step_finished", "step", "tool", "sub_query", "result", "elapsed"}
+    - {"type": "answer_delta", "text"} (only with stream=True)
+    - {"type": "done", "answer", "cached", "elapsed", "llm_round_trips"}
+    """
+    with count_round_trips() as round_trips:
+        yield from _pipeline_events(user_query, agents, stream, round_trips)
+
+def _pipeline_events(user_query: str, agents: dict, stream: bool, round_trips: dict):
+    started_at = time.perf_counter()
+
+    def done(answer: str, cached: bool = False) -> dict:
+        print(f"  - 📞 LLM round trips for this query: {round_trips['total']} {round_trips['by_role']}")
+        return {"type": "done", "answer": answer, "cached": cached, "elapsed": time.perf_counter() - started_at,
+                "llm_round_trips": round_trips["total"]}
+
+    def status(message: str) -> dict:
+        print(message)
+        return {"type": "status", "message": message}
+
+    semantic_cache = agents.get("semantic_cache")
+    if semantic_cache:
+        cached_answer = semantic_cache.lookup(user_query)
+        if cached_answer is not None:
+            yield status("⚡ [Semantic Cache] Found an answer to a very similar question.")
+            yield done(cached_answer, cached=True)
+            return
+
+    router = agents.get("router")
+    route = router.route(user_query) if router else None
+    if route and route["answer"]:
+        yield status("⚡ [Router] Answered a conversational message directly.")
+        yield done(route["answer"])
+        return
+
+    speculation = None
+    prefetch_pool = None
+    # finish() must run even if planning or a step raises (or the caller stops
+    # early), or the speculation's hit/waste never gets recorded
+    try:
+        if route:
+            yield status(f"\n⚡ [Router] Single-intent query ({route['reason']}). Skipping the planner...")
+            plan = [{"step": 1, "thought": f"Fast path: query {route['reason']}.", "tool": route["tool"], "sub_query": user_query}]
+        else:
+            # Vector search on the whole query is the most common plan, so start it
+            # now and hide its latency behind the planner call.
+            if "speculative_retriever" in agents:
+                speculation = agents["speculative_retriever"].start(user_query)
+            yield status("\n🚦 [Agent 1: Planner] Breaking down the query into a plan...")
+            plan = agents["planner"].process(user_query)
+        print(f"  - Generated Plan: {json.dumps(plan, indent=2)}")
+        yield {"type": "plan", "plan": plan}
+
+        yield status("\n🔎 [Execution Engine] Running the plan...")
+    
+        collected_context = []
+        # Fused mode: SQL the planner already wrote, keyed by its sub_query
+        planned_sql = {step.get("sub_query"): step["sql"] for step in plan if step.get("tool") == "SQL" and step.get("sql")}
+        sql_results = {}
+        # Independent VECTOR_SEARCH steps are searched together in one batch. The
+        # batch runs in the background, so SQL steps start right away and only
+        # the VECTOR_SEARCH steps wait for it.
+        vector_queries = list(dict.fromkeys(
+            step.get("sub_query") for step in plan
+            if step.get("tool") == "VECTOR_SEARCH" and step.get("sub_query") and "{{step_" not in step["sub_query"]
+        ))
+        prefetch = None
+        if len(vector_queries) > 1:
+            prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-batch")
+            prefetch = prefetch_pool.submit(_prefetch_vector_searches, vector_queries, agents, speculation)
+
+        def prefetched_chunks(sub_query: str):
+            if prefetch is None or sub_query not in vector_queries:
+                return None
+            try:
+                return prefetch.result().get(sub_query)
+            except Exception as e:
+                print(f"  - ⚠️ Batched vector search failed: {e}. Searching '{sub_query}' on its own.")
+                return None
+
+        def run_step(tool: str, sub_query: str) -> str:
+            if tool == "SQL":
+                outcome = agents["text_to_sql"].query(sub_query, planned_sql.get(sub_query))
+                sql_results[sub_query] = outcome["result"]
+                return outcome["text"]
+            elif tool == "VECTOR_SEARCH":
+                chunks = prefetched_chunks(sub_query)
+                if chunks is None and speculation:
+                    chunks = speculation.claim(sub_query)
+                return execute_rag_pipeline(sub_query, agents, chunks)
+            elif tool == "GENERAL":
+                return "This part of the query is conversational or cannot be answered by the available tools."
+            return ""
+
+        # Steps that don't reference each other's {{step_N_result}} run concurrently;
+        # the events still arrive in plan order.
+        for event in PlanExecutor(run_step).run(plan):
+            if event["type"] == "step_started":
+                print(f"\n  - Step {event['step']}: {event['thought']}")
+            else:
+                collected_context.append(f"Result for Step {event['step']} ('{event['sub_query']}'):\n{event['result']}")
+            yield event
+    finally:
+        if prefetch_pool:
+            prefetch_pool.shutdown(wait=False, cancel_futures=True)
+        if speculation:
+            speculation.finish()
+
+    if TEMPLATE_ANSWERS_ENABLED and len(plan) == 1 and plan[0].get("tool") == "SQL":
+        templated_answer = render_answer(user_query, next(iter(sql_results.values()), None))
+        if templated_answer is not None:
+            yield status("\n📝 [Answer Template] Result is simple enough to answer without the synthesizer.")
+            if semantic_cache:
+                semantic_cache.store(user_query, templated_answer)
+            yield done(templated_answer)
+            return
+
+    yield status("\n✍️ [Final Agent: Synthesizer] Generating final answer...")
+    
+    final_context, context_report = ContextAssembler("SYNTHESIZER").assemble_sections(collected_context)
+    yield {"type": "status", "message": f"    - Synthesizer context: {context_report['tokens_out']}/{context_report['budget']} tokens."}
+
+    if stream:
+        final_answer = ""
+        for delta in agents["synthesizer"].stream(user_query, final_context):
+            final_answer += delta
+            yield {"type": "answer_delta", "text": delta}
+    else:
+        final_answer = agents["synthesizer"].process(user_query, final_context)
+
+    if semantic_cache and not final_answer.startswith("Error:") and "[Error:" not in final_answer:
+        semantic_cache.store(user_query, final_answer)
+
+    yield done(final_answer)
+
+def run_agentic_pipeline(user_query: str, agents: dict, stream: bool = False):
+    """
+    Runs the pipeline, yielding human-readable status strings and finally the
+    answer. With stream=True the final item is an AnswerStream that yields the
+    synthesizer's tokens as they are generated.
+    """
+    events = iter_pipeline_events(user_query, agents, stream=stream)
+    for event in events:
+        kind = event["type"]
+        if kind == "status":
+            yield event["message"]
+        elif kind == "plan":
+            yield f"  - Generated Plan: {json.dumps(event['plan'], indent=2)}"
+        elif kind == "step_started":
+            yield f"\n  - Step {event['step']}: {event['thought']}"
+            yield f"    - Executing with tool '{event['tool']}': '{event['sub_query']}'"
+        elif kind == "step_finished":
+            yield f"    - Step {event['step']} finished in {event['elapsed']:.2f}s."
+        elif kind == "answer_delta":
+            def deltas(first=event["text"]):
+                yield first
+                for later in events:
+                    if later["type"] == "answer_delta":
+                        yield later["text"]
+            yield AnswerStream(deltas())
+            return
+        elif kind == "done":
+            yield event["answer"]
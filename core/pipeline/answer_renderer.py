@@ -0,0 +1,116 @@
+import os
+import re
+
+# --- Configuration ---
+# Single-step SQL plans whose result can be rendered deterministically skip the
+# synthesizer LLM call.
+TEMPLATE_ANSWERS_ENABLED = os.getenv("TEMPLATE_ANSWERS_ENABLED", "true").lower() == "true"
+TEMPLATE_MAX_CARDS = int(os.getenv("TEMPLATE_MAX_CARDS", 3))
+TEMPLATE_MAX_LIST_ITEMS = int(os.getenv("TEMPLATE_MAX_LIST_ITEMS", 10))
+
+NO_DATA_ANSWER = "I couldn't find any matching records in the university database for that question."
+
+# Per-table cards: the title column plus the labeled fields, in display order
+CARD_TEMPLATES = {
+    "lecturers": {
+        "noun": "lecturer",
+        "title": "name",
+        "fields": [
+            ("role", "Role"),
+            ("education", "Education"),
+            ("experience_in_pes", "Experience at PES"),
+            ("teaching_subjects", "Teaches"),
+            ("research_interest", "Research interests"),
+            ("responsibilities", "Responsibilities"),
+        ],
+    },
+    "clubs": {
+        "noun": "club",
+        "title": "name",
+        "fields": [
+            ("category", "Category"),
+            ("founded_year", "Founded"),
+            ("about", "About"),
+            ("goal", "Goal"),
+            ("recruitment_procedure", "Recruitment"),
+            ("recruitment_time", "Recruitment time"),
+        ],
+    },
+}
+
+COUNT_COLUMN_PATTERN = re.compile(r"^(count|total|num|number)(_|$)|_count$", re.I)
+HOW_MANY_PATTERN = re.compile(r"\bhow many\s+(.+?)(?:\s+(?:are|is|were|was|do|does|did|have|has|in|at|of|there)\b|[?.!]|$)", re.I)
+
+def _label(column: str) -> str:
+    return column.replace("_", " ").strip().capitalize()
+
+def _has_value(value) -> bool:
+    return value is not None and str(value).strip() != ""
+
+def _match_card(columns: list):
+    """Returns the card template whose table produced these columns, if any."""
+    shown = {c.lower() for c in columns if c.lower() != "id"}
+    for template in CARD_TEMPLATES.values():
+        fields = {name for name, _ in template["fields"]}
+        if template["title"] in shown and shown & fields and shown <= fields | {template["title"]}:
+            return template
+    return None
+
+def _render_cards(template: dict, result: dict) -> str:
+    index = {c.lower(): i for i, c in enumerate(result["columns"])}
+    cards = []
+    for row in result["rows"]:
+        lines = [f"**{row[index[template['title']]]}**"]
+        for name, label in template["fields"]:
+            if name in index and _has_value(row[index[name]]):
+                lines.append(f"- {label}: {str(row[index[name]]).strip()}")
+        cards.append("\n".join(lines))
+    if len(cards) == 1:
+        return cards[0]
+    return f"I found {result['total_rows']} matching {template['noun']}s:\n\n" + "\n\n".join(cards)
+
+def _render_count(query: str, column: str, value) -> str:
+    match = HOW_MANY_PATTERN.search(query)
+    if not match:
+        return f"{_label(column)}: {value}"
+    subject = match.group(1).strip()
+    if str(value) == "1":
+        return f"There is 1 {subject[:-1] if subject.endswith('s') and not subject.endswith('ss') else subject}."
+    return f"There are {value} {subject}."
+
+def _render_list(column: str, result: dict) -> str:
+    items = [str(row[0]).strip() for row in result["rows"] if _has_value(row[0])]
+    lines = [f"Here are the matching results ({_label(column).lower()}):"]
+    lines.extend(f"- {item}" for item in items)
+    if result["truncated"]:
+        lines.append("- ...and more not shown")
+    return "\n".join(lines)
+
+def render_answer(query: str, result: dict):
+    """
+    Renders an execute_read_only result as a final answer without an LLM: a
+    count sentence, a single value, lecturer/club cards for a few rows, or a
+    short list of names. Returns None when the result doesn't fit a template,
+    in which case the synthesizer should write the answer.
+    """
+    if result is None:
+        return None
+    rows, columns = result["rows"], result["columns"]
+    if not rows:
+        return NO_DATA_ANSWER
+
+    if result["total_rows"] == 1 and len(columns) == 1:
+        value = rows[0][0]
+        if value is None:
+            return NO_DATA_ANSWER
+        if COUNT_COLUMN_PATTERN.search(columns[0]) or HOW_MANY_PATTERN.search(query):
+            return _render_count(query, columns[0], value)
+        return f"{_label(columns[0])}: {value}"
+
+    template = _match_card(columns)
+    if template and result["total_rows"] <= TEMPLATE_MAX_CARDS:
+        return _render_cards(template, result)
+
+    if len(columns) == 1 and len(rows) <= TEMPLATE_MAX_LIST_ITEMS:
+        return _render_list(columns[0], result)
+    return None
@@ -0,0 +1,19 @@
+class AnswerStream:
+    """
+    Wraps a generator of answer text deltas. Iterating it passes the deltas
+    through while accumulating the full answer in `.text`; `.finished` is set
+    once the stream is exhausted.
+    """
+    def __init__(self, deltas):
+        self._deltas = deltas
+        self.text = ""
+        self.finished = False
+
+    def __iter__(self):
+        for delta in self._deltas:
+            self.text += delta
+            yield delta
+        self.finished = True
+
+    def __str__(self):
+        return self.text
@@ -0,0 +1,140 @@
+import os
+import re
+import tiktoken
+
+# --- Configuration ---
+# Token budgets for the context block of each role's prompt
+CONTEXT_BUDGETS = {
+    "REASONER": int(os.getenv("CONTEXT_BUDGET_REASONER", 3000)),
+    "SYNTHESIZER": int(os.getenv("CONTEXT_BUDGET_SYNTHESIZER", 4000)),
+}
+MIN_OVERLAP_CHARS = 30
+MAX_OVERLAP_CHARS = 400
+
+# Same tokenizer as the PDF chunker
+tokenizer = tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    return len(tokenizer.encode(text))
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokens = tokenizer.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return tokenizer.decode(tokens[:max(0, max_tokens)]).rstrip() + " …[truncated]"
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def _overlap_length(previous: str, current: str) -> int:
+    """Length of the longest suffix of previous that is a prefix of current."""
+    longest = min(len(previous), len(current), MAX_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(current[:size]):
+            return size
+    return 0
+
+class ContextAssembler:
+    """
+    Builds the context block of a prompt within a per-role token budget.
+
+    Duplicate material is removed first (identical or contained chunks, and the
+    overlapping head a chunk shares with the one before it); then, if the budget
+    is still exceeded, the lowest-priority material is cut first.
+    """
+    def __init__(self, role: str, budget_tokens: int = None):
+        self.role = role
+        self.budget_tokens = budget_tokens if budget_tokens is not None else CONTEXT_BUDGETS.get(role, 3000)
+
+    def _report(self, items_in: int, items_out: int, duplicates: int, tokens_in: int, tokens_out: int) -> dict:
+        report = {
+            "role": self.role, "items_in": items_in, "items_out": items_out, "duplicates_dropped": duplicates,
+            "tokens_in": tokens_in, "tokens_out": tokens_out, "budget": self.budget_tokens,
+        }
+        print(
+            f"  - 🧮 {self.role} context: {tokens_out}/{self.budget_tokens} tokens "
+            f"({items_in} items -> {items_out}, {duplicates} duplicate(s) dropped, {tokens_in} tokens before)"
+        )
+        return report
+
+    def _deduplicate(self, texts: list[str]):
+        kept, duplicates = [], 0
+        for text in texts:
+            normalized = _normalize(text)
+            if not normalized or any(normalized in _normalize(k) for k in kept):
+                duplicates += 1
+                continue
+            for previous in kept:
+                overlap = _overlap_length(previous, text)
+                if overlap:
+                    text = text[overlap:].lstrip()
+                    break
+            kept.append(text)
+        return kept, duplicates
+
+    def assemble_chunks(self, chunks: list[str], separator: str = "\n---\n"):
+        """
+        Assembles retrieved chunks, which arrive best-scoring first. Lower-ranked
+        chunks are dropped once the budget is used up; the first chunk is
+        truncated rather than dropped if it alone is over budget.
+
+        Returns:
+            tuple[str, dict]: (context, token report)
+        """
+        tokens_in = sum(count_tokens(c) for c in chunks)
+        unique, duplicates = self._deduplicate(chunks)
+
+        kept, used = [], 0
+        separator_tokens = count_tokens(separator)
+        for chunk in unique:
+            cost = count_tokens(chunk) + (separator_tokens if kept else 0)
+            if used + cost <= self.budget_tokens:
+                kept.append(chunk)
+                used += cost
+            elif not kept:
+                kept.append(_truncate_to_tokens(chunk, self.budget_tokens))
+                break
+            else:
+                break
+
+        context = separator.join(kept)
+        return context, self._report(len(chunks), len(kept), duplicates, tokens_in, count_tokens(context))
+
+    def assemble_sections(self, sections: list[str], separator: str = "\n\n---\n\n"):
+        """
+        Assembles per-step results, which have no relevance score. Repeated
+        lines are only kept the first time; if still over budget, every section
+        gets an equal share and only the sections larger than their share are
+        truncated, so one huge result can't crowd out the others.
+
+        Returns:
+            tuple[str, dict]: (context, token report)
+        """
+        tokens_in = sum(count_tokens(s) for s in sections)
+        seen_lines, cleaned, duplicates = set(), [], 0
+        for section in sections:
+            lines = []
+            for line in section.split("\n"):
+                key = _normalize(line)
+                # Short lines (headers, "- Step N finished") are never treated as duplicates
+                if len(key) > 40 and key in seen_lines:
+                    duplicates += 1
+                    continue
+                seen_lines.add(key)
+                lines.append(line)
+            cleaned.append("\n".join(lines))
+
+        available = self.budget_tokens - count_tokens(separator) * max(0, len(cleaned) - 1)
+        costs = [count_tokens(s) for s in cleaned]
+        if sum(costs) > available:
+            remaining, pending = available, sorted(range(len(cleaned)), key=lambda i: costs[i])
+            limits = {}
+            while pending:
+                share = remaining // len(pending)
+                index = pending.pop(0)
+                limits[index] = min(costs[index], share)
+                remaining -= limits[index]
+            cleaned = [_truncate_to_tokens(s, limits[i]) for i, s in enumerate(cleaned)]
+
+        context = separator.join(cleaned)
+        return context, self._report(len(sections), len(cleaned), duplicates, tokens_in, count_tokens(context))
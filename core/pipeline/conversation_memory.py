@@ -0,0 +1,145 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.llm.llm_client import generate_response
+
+# --- Configuration ---
+# Turns (user + assistant message pairs) kept verbatim; older turns are folded
+# into a running summary, a few at a time so we don't pay a summary call per turn.
+CONVERSATION_RECENT_TURNS = int(os.getenv("CONVERSATION_RECENT_TURNS", 4))
+CONVERSATION_SUMMARY_BATCH_TURNS = int(os.getenv("CONVERSATION_SUMMARY_BATCH_TURNS", 2))
+CONVERSATION_SUMMARY_MAX_CHARS = int(os.getenv("CONVERSATION_SUMMARY_MAX_CHARS", 1500))
+CONVERSATION_MESSAGE_MAX_CHARS = int(os.getenv("CONVERSATION_MESSAGE_MAX_CHARS", 600))
+# Summaries are written in the background, after the answer has gone out
+CONVERSATION_SUMMARY_WORKERS = int(os.getenv("CONVERSATION_SUMMARY_WORKERS", 2))
+
+# Words that usually point back at earlier turns ("what about his office?")
+REFERRING_WORDS = {
+    "it", "its", "they", "them", "their", "he", "him", "his", "she", "her", "hers",
+    "this", "that", "these", "those", "there", "same", "also", "else", "more", "above",
+    "previous", "earlier", "former", "latter", "one", "ones",
+}
+
+REWRITE_PROMPT = """
+You rewrite the user's latest message into a single standalone question for a university information desk.
+Resolve pronouns and references using the conversation. Keep names, departments and numbers exactly as written.
+If the message is already standalone, return it unchanged. Return only the question, nothing else.
+
+Conversation summary:
+{summary}
+
+Recent conversation:
+{recent}
+
+Latest message: {query}
+
+Standalone question:"""
+
+SUMMARY_PROMPT = """
+Update the running summary of a conversation between a user and a university information desk.
+Keep the people, clubs, departments, courses and facts that were asked about or answered, in at most {max_chars} characters.
+Return only the updated summary.
+
+Current summary:
+{summary}
+
+New conversation lines:
+{lines}
+
+Updated summary:"""
+
+def _format_messages(messages: list) -> str:
+    return "\n".join(f"{m['role']}: {m['content'][:CONVERSATION_MESSAGE_MAX_CHARS]}" for m in messages)
+
+def _is_self_contained(query: str) -> bool:
+    words = re.findall(r"[a-z']+", query.lower())
+    return len(words) >= 4 and not REFERRING_WORDS.intersection(words)
+
+class ConversationMemory:
+    """
+    Keeps the last N turns of a session verbatim plus an incrementally updated
+    summary of everything older, and turns each new message into a standalone
+    query so the planner's prompt stays the same size however long the session gets.
+    """
+    def __init__(self, session_store, recent_turns: int = CONVERSATION_RECENT_TURNS,
+                 batch_turns: int = CONVERSATION_SUMMARY_BATCH_TURNS,
+                 summary_workers: int = CONVERSATION_SUMMARY_WORKERS):
+        self.session_store = session_store
+        self.recent_turns = recent_turns
+        self.batch_turns = max(1, batch_turns)
+        self._summary_pool = ThreadPoolExecutor(max_workers=max(1, summary_workers), thread_name_prefix="summary")
+        # Sessions with a summary update queued or running; at most one each
+        self._summarizing = set()
+        self._lock = threading.Lock()
+
+    def standalone_query(self, session_id: str, query: str) -> str:
+        """Rewrites `query` so it can be answered without the conversation."""
+        history = self.session_store.get_history(session_id) or []
+        summary = self.session_store.get_summary(session_id)
+        if not history and not summary:
+            return query
+        if _is_self_contained(query):
+            print("  - 💬 Query is self-contained. Skipping the rewrite.")
+            return query
+
+        recent = _format_messages(history[-2 * self.recent_turns:])
+        rewritten = generate_response(
+            REWRITE_PROMPT.format(summary=summary or "(none)", recent=recent or "(none)", query=query),
+            role="CONVERSATION"
+        ).strip().strip('"')
+        if not rewritten or rewritten.startswith("Error:"):
+            # Degrade to the bounded transcript rather than losing the context
+            print("  - ⚠️ Query rewrite failed. Passing recent turns to the planner instead.")
+            return f"{recent}\nuser: {query}"
+        print(f"  - 💬 Standalone query: '{rewritten}'")
+        return rewritten
+
+    def record_turn(self, session_id: str, query: str, answer: str):
+        """
+        Stores a completed turn and returns; folding the oldest turns into the
+        summary (an LLM call) happens on a background worker. The store's size
+        caps are applied only after that, so turns are summarised before
+        anything is dropped.
+        """
+        self.session_store.append(session_id, [
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": answer},
+        ])
+        with self._lock:
+            if session_id in self._summarizing:
+                # The queued update reads the history when it runs, so it sees this turn
+                return
+            self._summarizing.add(session_id)
+        self._summary_pool.submit(self._summarize, session_id)
+
+    def _summarize(self, session_id: str):
+        try:
+            self._fold_into_summary(session_id)
+        except Exception as e:
+            print(f"  - ⚠️ Conversation summary update failed: {e}")
+        finally:
+            self.session_store.trim(session_id)
+            with self._lock:
+                self._summarizing.discard(session_id)
+
+    def _fold_into_summary(self, session_id: str):
+        history = self.session_store.get_history(session_id) or []
+        overflow = len(history) - 2 * self.recent_turns
+        if overflow < 2 * self.batch_turns:
+            return
+
+        summary = generate_response(
+            SUMMARY_PROMPT.format(
+                max_chars=CONVERSATION_SUMMARY_MAX_CHARS,
+                summary=self.session_store.get_summary(session_id) or "(none)",
+                lines=_format_messages(history[:overflow])
+            ),
+            role="CONVERSATION"
+        ).strip()
+        if not summary or summary.startswith("Error:"):
+            # Keep the turns verbatim and try again after the next turn
+            print("  - ⚠️ Conversation summary update failed. Keeping older turns verbatim.")
+            return
+        self.session_store.compact(session_id, summary[:CONVERSATION_SUMMARY_MAX_CHARS], overflow)
+        print(f"  - 🗜️ Folded {overflow // 2} older turns into the conversation summary.")
@@ -0,0 +1,30 @@
+import os
+import time
+
+# --- Configuration ---
+DATA_VERSION_PATH = os.getenv("DATA_VERSION_PATH", "data/cache/data_version")
+
+def get_data_version() -> str:
+    """
+    Returns the current version stamp of the knowledge base (database tables and
+    vector store). Caches built on top of that data compare against it to know
+    when they have gone stale. Returns "0" if nothing has been recorded yet.
+    """
+    try:
+        with open(DATA_VERSION_PATH, "r", encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except OSError:
+        return "0"
+
+def bump_data_version(reason: str) -> str:
+    """
+    Records that the underlying data changed. Called by the ingestion scripts
+    after they have written to PostgreSQL or rebuilt the vector store; running
+    app processes pick the change up on their next query.
+    """
+    version = f"{time.time():.6f}"
+    os.makedirs(os.path.dirname(DATA_VERSION_PATH) or ".", exist_ok=True)
+    with open(DATA_VERSION_PATH, "w", encoding="utf-8") as f:
+        f.write(version)
+    print(f"  - 🔁 Data version bumped ({reason}). Dependent caches will be refreshed.")
+    return version
@@ -0,0 +1,124 @@
+import os
+import re
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# --- Configuration ---
+PLAN_MAX_WORKERS = int(os.getenv("PLAN_MAX_WORKERS", 4))
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{step_(\d+)_result\}\}")
+
+
+def build_dependency_graph(plan: list) -> list[set]:
+    """
+    Reads the {{step_N_result}} placeholders of every step and returns, for each
+    step (by position in the plan), the set of earlier positions it depends on.
+    References to unknown or later steps are ignored, exactly as the sequential
+    engine never resolved them either.
+    """
+    position_of = {}
+    dependencies = []
+    for index, step in enumerate(plan):
+        deps = set()
+        for step_num in PLACEHOLDER_PATTERN.findall(step.get("sub_query") or ""):
+            dep_index = position_of.get(int(step_num))
+            if dep_index is not None:
+                deps.add(dep_index)
+        dependencies.append(deps)
+        position_of.setdefault(step.get("step"), index)
+    return dependencies
+
+
+def substitute_placeholders(sub_query: str, step_results: dict) -> str:
+    """Replaces {{step_N_result}} placeholders with the quoted result of step N."""
+    for step_num in PLACEHOLDER_PATTERN.findall(sub_query):
+        prev_step_result = step_results.get(int(step_num))
+        if prev_step_result:
+            sub_query = sub_query.replace(f"{{{{step_{step_num}_result}}}}", f'"{prev_step_result}"')
+    return sub_query
+
+
+class PlanExecutor:
+    """
+    Executes a planner's plan as a DAG: a step starts as soon as every step it
+    references through a placeholder has finished, so independent steps overlap
+    on a bounded thread pool.
+
+    Events are still yielded strictly in plan order (step_started, then
+    step_finished, step by step), so callers see the same sequence as the old
+    sequential loop regardless of which step actually finishes first.
+    """
+    def __init__(self, run_step, max_workers: int = PLAN_MAX_WORKERS):
+        """
+        Args:
+            run_step: Callable (tool, sub_query) -> str that executes one step.
+            max_workers (int): Upper bound on steps running at the same time.
+        """
+        self.run_step = run_step
+        self.max_workers = max(1, max_workers)
+
+    def _timed_run(self, tool: str, sub_query: str):
+        start = time.perf_counter()
+        result = self.run_step(tool, sub_query)
+        return result, time.perf_counter() - start
+
+    def run(self, plan: list):
+        """
+        Runs the plan and yields event dictionaries:
+        - {"type": "step_started", "step", "thought", "tool", "sub_query"}
+        - {"type": "step_finished", "step", "tool", "sub_query", "result", "elapsed"}
+        """
+        dependencies = build_dependency_graph(plan)
+        outcomes = {}
+        resolved_queries = {}
+        futures = {}
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan-step")
+
+        def collect(done_futures):
+            for index, future in list(futures.items()):
+                if future in done_futures and index not in outcomes:
+                    outcomes[index] = future.result()
+
+        def submit_ready():
+            for index, step in enumerate(plan):
+                if index in futures or not dependencies[index].issubset(outcomes):
+                    continue
+                # Only the step's own dependencies are visible, so a forward
+                # reference never picks up a result that merely finished early.
+                step_results = {plan[d].get("step"): outcomes[d][0] for d in dependencies[index]}
+                sub_query = substitute_placeholders(step.get("sub_query") or "", step_results)
+                resolved_queries[index] = sub_query
+                # Steps see the caller's context (e.g. the LLM round-trip counter)
+                futures[index] = pool.submit(contextvars.copy_context().run, self._timed_run, step.get("tool"), sub_query)
+
+        try:
+            submit_ready()
+            for index, step in enumerate(plan):
+                yield {
+                    "type": "step_started",
+                    "step": step.get("step"),
+                    "thought": step.get("thought"),
+                    "tool": step.get("tool"),
+                    "sub_query": resolved_queries[index],
+                }
+                while index not in outcomes:
+                    pending = [f for i, f in futures.items() if i not in outcomes]
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                    submit_ready()
+
+                result, elapsed = outcomes[index]
+                yield {
+                    "type": "step_finished",
+                    "step": step.get("step"),
+                    "tool": step.get("tool"),
+                    "sub_query": resolved_queries[index],
+                    "result": result,
+                    "elapsed": elapsed,
+                }
+        finally:
+            # Don't block on (or start) work nobody will consume, e.g. when the
+            # caller stops iterating or a step raised.
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import time
+import threading
+import numpy as np
+from sqlalchemy import text
+from core.db.database import engine
+from core.pipeline.data_version import get_data_version
+
+# --- Configuration ---
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+# Extra labeled examples ([{"query": ..., "tool": "SQL" | "VECTOR_SEARCH"}, ...])
+ROUTER_EXAMPLES_PATH = os.getenv("ROUTER_EXAMPLES_PATH", "data/router_examples.json")
+# The classifier only decides when its best label is this similar to a known
+# example and clearly ahead of the runner-up; otherwise the planner LLM decides.
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", 0.6))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", 0.08))
+
+# Same routing the planner prompt describes (see test_intelligent_routing.py)
+ROUTER_EXAMPLES = [
+    {"query": "Who is Dr. Sandesh BJ?", "tool": "SQL"},
+    {"query": "Tell me about Maaya club", "tool": "SQL"},
+    {"query": "Show me all professors", "tool": "SQL"},
+    {"query": "Which clubs were founded in 2020?", "tool": "SQL"},
+    {"query": "How many assistant professors are there?", "tool": "SQL"},
+    {"query": "List all technical clubs", "tool": "SQL"},
+    {"query": "What are the research interests of the lecturer?", "tool": "SQL"},
+    {"query": "Which faculty members teach machine learning?", "tool": "SQL"},
+    {"query": "When does the club recruit new members?", "tool": "SQL"},
+    {"query": "What is the education background of the professor?", "tool": "SQL"},
+    {"query": "How many credits is the course?", "tool": "SQL"},
+    {"query": "Which campuses does the university have?", "tool": "SQL"},
+    {"query": "What subjects are taught in semester 5?", "tool": "VECTOR_SEARCH"},
+    {"query": "What is the admission process?", "tool": "VECTOR_SEARCH"},
+    {"query": "Tell me about course objectives for Computer Science", "tool": "VECTOR_SEARCH"},
+    {"query": "What are the university policies?", "tool": "VECTOR_SEARCH"},
+    {"query": "What is the syllabus for data structures?", "tool": "VECTOR_SEARCH"},
+    {"query": "What are the attendance rules?", "tool": "VECTOR_SEARCH"},
+    {"query": "When was the university established?", "tool": "VECTOR_SEARCH"},
+    {"query": "What are the course outcomes of the elective?", "tool": "VECTOR_SEARCH"},
+    {"query": "Explain the examination and grading system", "tool": "VECTOR_SEARCH"},
+    {"query": "What facilities are available on campus?", "tool": "VECTOR_SEARCH"},
+]
+
+GREETING_ANSWERS = [
+    (re.compile(r"^(hi+|hello+|hey+|hiya|greetings|good (morning|afternoon|evening)|namaste|yo)\b[\s!.,]*(there|vid)?[\s!.,]*$", re.I),
+     "Hello! I'm VID, the PES University virtual information desk. Ask me about lecturers, clubs, courses or university policies."),
+    (re.compile(r"^(thanks?( you)?|thank u|thx|ty|cheers|great|awesome|cool|ok(ay)?|got it)\b[\s!.,]*(so much|a lot|vid)?[\s!.,]*$", re.I),
+     "You're welcome! Let me know if there's anything else you'd like to know."),
+    (re.compile(r"^(bye+|goodbye|see (you|ya)|good ?night)\b[\s!.,]*$", re.I),
+     "Goodbye! Come back any time you have questions about PES University."),
+    (re.compile(r"^(who are you|what are you|what can you do|help)\??[\s!.]*$", re.I),
+     "I'm VID, the PES University virtual information desk. I can answer questions about lecturers, student clubs, courses, the curriculum and university policies."),
+]
+
+# Anything that looks like more than one request goes to the planner
+COMPOUND_PATTERN = re.compile(r"\b(and|also|plus|then|as well as|along with|compare|versus|vs)\b|;|\?.*\?", re.I)
+# Case-sensitive on purpose: "Dr. Rao" names someone, "MS admissions" and
+# "the professor in charge" don't
+TITLE_PATTERN = re.compile(r"\b(Dr|Prof|Mr|Mrs|Ms)\b\.?\s+[A-Z][a-z]+")
+
+def _normalize(value: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", value.lower()))
+
+class QueryRouter:
+    """
+    Cheap router in front of the planner LLM. Rules answer greetings directly
+    and send queries that name a known lecturer or club straight to SQL; a
+    nearest-example classifier over MiniLM embeddings handles the remaining
+    single-intent queries. Anything compound or ambiguous returns None so the
+    planner LLM decides.
+    """
+    def __init__(self, embeddings, examples: list = None):
+        """
+        Args:
+            embeddings: A LangChain embeddings object (e.g. VectorStore.query_embeddings).
+            examples (list): Labeled {"query", "tool"} examples. Defaults to
+                ROUTER_EXAMPLES plus anything in ROUTER_EXAMPLES_PATH.
+        """
+        self.embeddings = embeddings
+        self._lock = threading.Lock()
+        self._entities = None
+        self._entities_version = None
+        self.stats = {"greeting": 0, "entity": 0, "classifier": 0, "planner": 0}
+
+        examples = examples if examples is not None else ROUTER_EXAMPLES + self._load_extra_examples()
+        self.labels = [example["tool"] for example in examples]
+        vectors = np.array(self.embeddings.embed_documents([example["query"] for example in examples]), dtype="float32")
+        self.example_vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        print(f"  - 🧭 Query router ready with {len(examples)} labeled examples.")
+
+    @staticmethod
+    def _load_extra_examples() -> list:
+        if not os.path.exists(ROUTER_EXAMPLES_PATH):
+            return []
+        try:
+            with open(ROUTER_EXAMPLES_PATH, "r", encoding="utf-8") as f:
+                return [e for e in json.load(f) if e.get("query") and e.get("tool") in ("SQL", "VECTOR_SEARCH")]
+        except Exception as e:
+            print(f"  - ⚠️ Could not load router examples from {ROUTER_EXAMPLES_PATH}: {e}")
+            return []
+
+    def _get_entities(self) -> dict:
+        """
+        Normalized lecturer and club names, reloaded when the data version
+        changes. A failed load isn't cached, so the next query tries again.
+        """
+        with self._lock:
+            data_version = get_data_version()
+            if self._entities is None or self._entities_version != data_version:
+                entities = {"lecturer": set(), "club": set()}
+                try:
+                    with engine.connect() as connection:
+                        for kind, table in (("lecturer", "lecturers"), ("club", "clubs")):
+                            for (name,) in connection.execute(text(f"SELECT name FROM {table}")):
+                                name = _normalize(re.sub(r"^(dr|prof)\.?\s+", "", name or "", flags=re.I))
+                                if kind == "club":
+                                    name = re.sub(r"\s*\bclub\b\s*", " ", name).strip()
+                                if len(name) >= 3:
+                                    entities[kind].add(name)
+                except Exception as e:
+                    print(f"  - ⚠️ Could not load entity names for the router: {e}")
+                    return self._entities or entities
+                self._entities = entities
+                self._entities_version = data_version
+            return self._entities
+
+    def _match_entity(self, normalized_query: str):
+        padded = f" {normalized_query} "
+        for kind, names in self._get_entities().items():
+            for name in names:
+                if f" {name} " in padded:
+                    return kind, name
+        return None
+
+    def _classify(self, query: str):
+        vector = np.array(self.embeddings.embed_query(query), dtype="float32")
+        similarities = self.example_vectors @ (vector / np.linalg.norm(vector))
+        best = {}
+        for label, similarity in zip(self.labels, similarities):
+            best[label] = max(best.get(label, -1.0), float(similarity))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        top_label, top_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if top_score >= ROUTER_MIN_SIMILARITY and top_score - runner_up >= ROUTER_MIN_MARGIN:
+            return top_label, top_score
+        return None
+
+    def route(self, query: str):
+        """
+        Returns {"tool", "reason", "answer"} for queries that can skip the
+        planner ("answer" is set for greetings, which need no tools at all),
+        or None when the planner should decide.
+        """
+        start = time.perf_counter()
+        route = self._route(query.strip())
+        with self._lock:
+            self.stats[route["kind"] if route else "planner"] += 1
+        print(f"  - 🧭 Router decision: {route['reason'] if route else 'planner'} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return route
+
+    def _route(self, query: str):
+        for pattern, answer in GREETING_ANSWERS:
+            if pattern.match(query):
+                return {"kind": "greeting", "tool": "GENERAL", "reason": "greeting", "answer": answer}
+
+        if COMPOUND_PATTERN.search(query):
+            return None
+
+        entity = self._match_entity(_normalize(query))
+        if entity:
+            return {"kind": "entity", "tool": "SQL", "reason": f"names {entity[0]} '{entity[1]}'", "answer": None}
+        if TITLE_PATTERN.search(query):
+            return {"kind": "entity", "tool": "SQL", "reason": "names a lecturer by title", "answer": None}
+
+        decision = self._classify(query)
+        if decision:
+            return {"kind": "classifier", "tool": decision[0], "reason": f"classified as {decision[0]} ({decision[1]:.2f})", "answer": None}
+        return None
+
+    def snapshot(self) -> dict:
+        total = sum(self.stats.values())
+        return {**self.stats, "fast_path_rate": round(1 - self.stats["planner"] / total, 3) if total else None}
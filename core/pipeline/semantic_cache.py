@@ -0,0 +1,227 @@
+import os
+import re
+import json
+import time
+import atexit
+import threading
+import faiss
+import numpy as np
+from core.pipeline.data_version import get_data_version
+
+# --- Configuration ---
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "data/cache/semantic_cache")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", 86400))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+# Changes are written to disk at most this often (and on exit), not on every store
+SEMANTIC_CACHE_SAVE_INTERVAL = float(os.getenv("SEMANTIC_CACHE_SAVE_INTERVAL_SECONDS", 30))
+# Neighbours checked per lookup, so a near-duplicate with other key terms doesn't hide a real match
+SEMANTIC_CACHE_CANDIDATES = 5
+
+# Numbers, codes (CS101) and capitalised names: queries that differ in these
+# embed almost identically but must not share an answer.
+KEY_TERM_PATTERN = re.compile(r"\b\w*\d\w*\b|(?<!^)\b[A-Z][\w'-]*")
+
+def _key_terms(query: str) -> set:
+    return {term.lower() for term in KEY_TERM_PATTERN.findall(query.strip())}
+
+class SemanticCache:
+    """
+    A whole-answer cache keyed by query meaning rather than exact text.
+
+    Past queries are embedded with the same MiniLM model the VectorStore uses
+    and kept in a small inner-product FAISS index. A new query whose cosine
+    similarity to a cached one is at least the threshold, and that mentions the
+    same numbers, codes and names, gets the cached final answer back. Entries
+    expire after the TTL, and the whole cache is dropped when the data version
+    changes (see core.pipeline.data_version).
+
+    Changes are written at most every SEMANTIC_CACHE_SAVE_INTERVAL seconds and
+    on exit, each file replaced atomically. With several worker processes the last writer wins, which only
+    costs cached answers, never a corrupt file.
+    """
+    def __init__(self, embeddings, store_path: str = SEMANTIC_CACHE_PATH,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl_seconds: float = SEMANTIC_CACHE_TTL,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            embeddings: A LangChain embeddings object (e.g. VectorStore.query_embeddings).
+            store_path (str): Directory where the index and entries are persisted.
+            threshold (float): Minimum cosine similarity for a hit.
+            ttl_seconds (float): How long an answer stays valid.
+            max_entries (int): Oldest entries are evicted beyond this size.
+        """
+        self.embeddings = embeddings
+        self.store_path = store_path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load()
+        atexit.register(self.flush)
+
+    # --- Persistence ---
+
+    def _index_file(self):
+        return os.path.join(self.store_path, "queries.index")
+
+    def _entries_file(self):
+        return os.path.join(self.store_path, "entries.json")
+
+    def _reset(self, dimension: int = None):
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dimension)) if dimension else None
+        self.entries = {}
+        self.next_id = 0
+        self.data_version = get_data_version()
+
+    def _load(self):
+        self._reset()
+        if not (os.path.exists(self._index_file()) and os.path.exists(self._entries_file())):
+            return
+        try:
+            with open(self._entries_file(), "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self.index = faiss.read_index(self._index_file())
+            self.entries = {int(k): v for k, v in saved["entries"].items()}
+            self.next_id = saved["next_id"]
+            self.data_version = saved["data_version"]
+            print(f"  - Loaded semantic cache with {len(self.entries)} answers.")
+        except Exception as e:
+            print(f"  - ⚠️ Could not load semantic cache: {e}. Starting empty.")
+            self._reset()
+
+    def _mark_dirty(self) -> bool:
+        """Records an unsaved change. Returns True when a save is due; call with self._lock held."""
+        self._dirty = True
+        return time.monotonic() - self._last_save >= SEMANTIC_CACHE_SAVE_INTERVAL
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def flush(self):
+        """Writes pending changes to disk. Serializes under the lock, writes outside it."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty or self.index is None:
+                    return
+                index_bytes = faiss.serialize_index(self.index).tobytes()
+                entries_bytes = json.dumps(
+                    {"entries": self.entries, "next_id": self.next_id, "data_version": self.data_version}
+                ).encode("utf-8")
+                self._dirty = False
+                self._last_save = time.monotonic()
+            try:
+                os.makedirs(self.store_path, exist_ok=True)
+                self._write_atomic(self._index_file(), index_bytes)
+                self._write_atomic(self._entries_file(), entries_bytes)
+            except Exception as e:
+                print(f"  - ⚠️ Could not save semantic cache: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    # --- Maintenance ---
+
+    def _check_data_version(self):
+        if self.data_version != get_data_version():
+            print("  - 🔁 Knowledge base changed. Clearing semantic cache.")
+            dimension = self.index.d if self.index is not None else None
+            self._reset(dimension)
+            self.stats["invalidations"] += 1
+            self._mark_dirty()
+
+    def _remove(self, ids: list):
+        if ids:
+            self.index.remove_ids(np.array(ids, dtype=np.int64))
+            for entry_id in ids:
+                self.entries.pop(entry_id, None)
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.array([self.embeddings.embed_query(query.strip())], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def invalidate(self):
+        """Drops every cached answer."""
+        with self._lock:
+            dimension = self.index.d if self.index is not None else None
+            self._reset(dimension)
+            self.stats["invalidations"] += 1
+            self._mark_dirty()
+        self.flush()
+
+    # --- Public API ---
+
+    def lookup(self, query: str):
+        """Returns the cached answer for a similar enough query with the same key terms, or None."""
+        with self._lock:
+            self._check_data_version()
+            if self.index is None or self.index.ntotal == 0:
+                self.stats["misses"] += 1
+                return None
+
+            scores, ids = self.index.search(self._embed(query), SEMANTIC_CACHE_CANDIDATES)
+            key_terms = _key_terms(query)
+            now, expired, hit = time.time(), [], None
+            for score, entry_id in zip(scores[0], ids[0]):
+                entry = self.entries.get(int(entry_id))
+                if entry_id == -1 or score < self.threshold:
+                    break
+                if entry is None:
+                    continue
+                if now - entry["created_at"] > self.ttl_seconds:
+                    expired.append(int(entry_id))
+                elif _key_terms(entry["query"]) == key_terms:
+                    hit = (float(score), entry)
+                    break
+            if expired:
+                self._remove(expired)
+                self._mark_dirty()
+            if hit is None:
+                self.stats["misses"] += 1
+                return None
+
+            score, entry = hit
+            print(f"  - ⚡ Semantic cache hit ({score:.3f}) on '{entry['query']}'")
+            self.stats["hits"] += 1
+            return entry["answer"]
+
+    def store(self, query: str, answer: str):
+        """Caches the final answer for a query."""
+        with self._lock:
+            self._check_data_version()
+            vector = self._embed(query)
+            if self.index is None:
+                self._reset(vector.shape[1])
+
+            now = time.time()
+            expired = [i for i, e in self.entries.items() if now - e["created_at"] > self.ttl_seconds]
+            self._remove(expired)
+            overflow = len(self.entries) + 1 - self.max_entries
+            if overflow > 0:
+                oldest = sorted(self.entries, key=lambda i: self.entries[i]["created_at"])[:overflow]
+                self._remove(oldest)
+
+            entry_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self.entries[entry_id] = {"query": query, "answer": answer, "created_at": now}
+            self.stats["stores"] += 1
+            save_due = self._mark_dirty()
+        if save_due:
+            self.flush()
+
+    def snapshot(self) -> dict:
+        """Returns hit/miss counters and the number of cached answers."""
+        with self._lock:
+            return {**self.stats, "size": len(self.entries)}
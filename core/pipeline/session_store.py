@@ -0,0 +1,258 @@
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# --- Configuration ---
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory").lower()
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "data/cache/sessions.sqlite3")
+SESSION_TTL = float(os.getenv("SESSION_TTL_SECONDS", 3600))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 10000))
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", 20))
+SESSION_MAX_CHARS = int(os.getenv("SESSION_MAX_CHARS", 20000))
+
+def _drop_oldest_turn(messages: list) -> list:
+    """Drops the first message and the replies that follow it, so history starts at a user message."""
+    i = 1
+    while i < len(messages) and messages[i]["role"] != "user":
+        i += 1
+    return messages[i:]
+
+def _trim(messages: list, max_messages: int, max_chars: int) -> list:
+    """Drops the oldest whole turns until both per-session caps are met; the latest turn is always kept."""
+    def over_caps(kept):
+        return (max_messages and len(kept) > max_messages) or sum(len(m["content"]) for m in kept) > max_chars
+
+    while over_caps(messages):
+        rest = _drop_oldest_turn(messages)
+        if not rest:
+            break
+        messages = rest
+    return messages
+
+class InMemorySessionStore:
+    """
+    Process-local session store: an LRU of sessions with idle TTL expiry and
+    per-session caps on message count and size. The caps are applied by
+    trim(), which ConversationMemory calls after folding old turns into the
+    summary, so they only bite when summarising keeps failing.
+    """
+    def __init__(self, ttl_seconds: float = SESSION_TTL, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_messages: int = SESSION_MAX_MESSAGES, max_chars: int = SESSION_MAX_CHARS):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _expire(self):
+        now = time.time()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session["last_used"] < self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def create(self) -> str:
+        session_id = str(uuid.uuid4())
+        with self._lock:
+            self._expire()
+            self._sessions[session_id] = {"messages": [], "summary": "", "last_used": time.time()}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session_id
+
+    def get_history(self, session_id: str):
+        """Returns the session's messages, or None if it doesn't exist (or expired)."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session["last_used"] = time.time()
+            self._sessions.move_to_end(session_id)
+            return list(session["messages"])
+
+    def append(self, session_id: str, messages: list):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session["messages"] = session["messages"] + messages
+            session["last_used"] = time.time()
+            self._sessions.move_to_end(session_id)
+
+    def trim(self, session_id: str):
+        """Drops the oldest whole turns beyond the per-session caps."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session["messages"] = _trim(session["messages"], self.max_messages, self.max_chars)
+
+    def get_summary(self, session_id: str) -> str:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session["summary"] if session else ""
+
+    def compact(self, session_id: str, summary: str, drop_messages: int):
+        """Replaces the summary and drops the oldest `drop_messages` messages it now covers."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session["summary"] = summary
+            session["messages"] = session["messages"][drop_messages:]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire()
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "messages": sum(len(s["messages"]) for s in self._sessions.values()),
+                "content_bytes": sum(
+                    len(s["summary"].encode("utf-8")) + sum(len(m["content"].encode("utf-8")) for m in s["messages"])
+                    for s in self._sessions.values()
+                ),
+                "evictions": self.evictions,
+            }
+
+class SQLiteSessionStore:
+    """
+    Session store backed by a SQLite file, so several worker processes on the
+    same host share sessions without sticky routing. Same caps and TTL as the
+    in-memory store.
+    """
+    def __init__(self, db_path: str = SESSION_STORE_PATH, ttl_seconds: float = SESSION_TTL,
+                 max_sessions: int = SESSION_MAX_SESSIONS, max_messages: int = SESSION_MAX_MESSAGES,
+                 max_chars: int = SESSION_MAX_CHARS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self._local = threading.local()
+        self.evictions = 0
+        conn = self._conn()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, created_at REAL, last_used REAL, summary TEXT DEFAULT '');"
+            "CREATE INDEX IF NOT EXISTS idx_sessions_last_used ON sessions(last_used);"
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, role TEXT, content TEXT);"
+            "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets several processes read and write
+        if getattr(self._local, "conn", None) is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return self._local.conn
+
+    def _delete_sessions(self, conn, where: str, params: tuple):
+        ids = [row[0] for row in conn.execute(f"SELECT id FROM sessions WHERE {where}", params)]
+        if ids:
+            marks = ",".join("?" * len(ids))
+            conn.execute(f"DELETE FROM messages WHERE session_id IN ({marks})", ids)
+            conn.execute(f"DELETE FROM sessions WHERE id IN ({marks})", ids)
+            self.evictions += len(ids)
+
+    def _expire(self, conn):
+        self._delete_sessions(conn, "last_used < ?", (time.time() - self.ttl_seconds,))
+
+    def create(self) -> str:
+        session_id = str(uuid.uuid4())
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            self._expire(conn)
+            conn.execute("INSERT INTO sessions (id, created_at, last_used) VALUES (?, ?, ?)", (session_id, now, now))
+            self._delete_sessions(
+                conn, "id IN (SELECT id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_sessions,)
+            )
+        return session_id
+
+    def get_history(self, session_id: str):
+        """Returns the session's messages, or None if it doesn't exist (or expired)."""
+        conn = self._conn()
+        with conn:
+            row = conn.execute("SELECT last_used FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None or time.time() - row[0] >= self.ttl_seconds:
+                return None
+            conn.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (time.time(), session_id))
+            rows = conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, session_id: str, messages: list):
+        conn = self._conn()
+        with conn:
+            if conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is None:
+                return
+            conn.executemany(
+                "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                [(session_id, m["role"], m["content"]) for m in messages]
+            )
+            conn.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (time.time(), session_id))
+
+    def trim(self, session_id: str):
+        """Drops the oldest whole turns beyond the per-session caps."""
+        conn = self._conn()
+        with conn:
+            rows = conn.execute(
+                "SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+            kept = _trim([{"id": i, "role": r, "content": c} for i, r, c in rows], self.max_messages, self.max_chars)
+            if kept and len(kept) < len(rows):
+                conn.execute("DELETE FROM messages WHERE session_id = ? AND id < ?", (session_id, kept[0]["id"]))
+
+    def get_summary(self, session_id: str) -> str:
+        row = self._conn().execute("SELECT summary FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return (row[0] or "") if row else ""
+
+    def compact(self, session_id: str, summary: str, drop_messages: int):
+        """Replaces the summary and drops the oldest `drop_messages` messages it now covers."""
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE sessions SET summary = ? WHERE id = ?", (summary, session_id))
+            conn.execute(
+                "DELETE FROM messages WHERE id IN "
+                "(SELECT id FROM messages WHERE session_id = ? ORDER BY id LIMIT ?)", (session_id, drop_messages)
+            )
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        with conn:
+            self._expire(conn)
+            sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            messages, content_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM messages"
+            ).fetchone()
+            content_bytes += conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(CAST(summary AS BLOB))), 0) FROM sessions"
+            ).fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "messages": messages,
+            "content_bytes": content_bytes,
+            "evictions": self.evictions,
+        }
+
+def create_session_store():
+    """Builds the session store selected by SESSION_STORE_BACKEND (memory or sqlite)."""
+    if SESSION_STORE_BACKEND == "sqlite":
+        return SQLiteSessionStore()
+    if SESSION_STORE_BACKEND != "memory":
+        print(f"  - ⚠️ Unknown SESSION_STORE_BACKEND '{SESSION_STORE_BACKEND}'. Using in-memory sessions.")
+    return InMemorySessionStore()
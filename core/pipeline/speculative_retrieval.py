@@ -0,0 +1,96 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+SPECULATIVE_RETRIEVAL_ENABLED = os.getenv("SPECULATIVE_RETRIEVAL_ENABLED", "false").lower() == "true"
+# A VECTOR_SEARCH sub_query at least this similar (cosine) to the user query
+# reuses the speculative result instead of searching again.
+SPECULATIVE_RETRIEVAL_MIN_SIMILARITY = float(os.getenv("SPECULATIVE_RETRIEVAL_MIN_SIMILARITY", 0.9))
+SPECULATIVE_RETRIEVAL_WORKERS = int(os.getenv("SPECULATIVE_RETRIEVAL_WORKERS", 2))
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class Speculation:
+    """One speculative retrieval of the whole user query, started before the plan is known."""
+    def __init__(self, owner, query: str, future):
+        self.owner = owner
+        self.query = query
+        self.future = future
+        self.used = False
+        self._lock = threading.Lock()
+
+    def claim(self, sub_query: str):
+        """
+        Returns the speculatively retrieved chunks if `sub_query` is close enough
+        to the original query, otherwise None (the caller searches as usual).
+        """
+        if _normalize(sub_query) == _normalize(self.query):
+            similarity = 1.0
+        else:
+            try:
+                query_embedding = self.future.result()[1]
+            except Exception as e:
+                print(f"  - ⚠️ Speculative retrieval failed: {e}")
+                return None
+            sub_embedding = self.owner.embeddings.embed_query(sub_query)
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            similarity = sum(a * b for a, b in zip(query_embedding, sub_embedding))
+        if similarity < self.owner.min_similarity:
+            return None
+        try:
+            chunks = self.future.result()[0]
+        except Exception as e:
+            print(f"  - ⚠️ Speculative retrieval failed: {e}")
+            return None
+        print(f"  - 🎯 Reusing speculative retrieval for '{sub_query}' (similarity {similarity:.2f}).")
+        with self._lock:
+            self.used = True
+        return chunks
+
+    def finish(self):
+        """Records whether the speculation paid off and drops it if it never started."""
+        if not self.used:
+            self.future.cancel()
+        self.owner._record(self.used)
+
+class SpeculativeRetriever:
+    """
+    Starts RetrieverAgent.process(user_query) while the planner LLM is still
+    thinking, so the common "vector search the whole question" plan finds its
+    chunks already retrieved. Keeps a hit rate to show whether it pays off.
+    """
+    def __init__(self, retriever, embeddings, min_similarity: float = SPECULATIVE_RETRIEVAL_MIN_SIMILARITY,
+                 max_workers: int = SPECULATIVE_RETRIEVAL_WORKERS):
+        """
+        Args:
+            retriever: The RetrieverAgent used for the speculative search.
+            embeddings: A LangChain embeddings object with normalized output
+                (e.g. VectorStore.query_embeddings), used to compare sub_queries.
+            min_similarity (float): Minimum cosine similarity for a reuse.
+            max_workers (int): Speculative searches running at the same time.
+        """
+        self.retriever = retriever
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="speculative-retrieval")
+        self._lock = threading.Lock()
+        self.stats = {"speculations": 0, "hits": 0, "misses": 0}
+
+    def _retrieve(self, query: str):
+        return self.retriever.process(query), self.embeddings.embed_query(query)
+
+    def start(self, query: str) -> Speculation:
+        print("  - 🔮 Speculatively retrieving documents for the whole query...")
+        return Speculation(self, query, self._pool.submit(self._retrieve, query))
+
+    def _record(self, hit: bool):
+        with self._lock:
+            self.stats["speculations"] += 1
+            self.stats["hits" if hit else "misses"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.stats["speculations"]
+            return {**self.stats, "hit_rate": round(self.stats["hits"] / total, 3) if total else None}
@@ -0,0 +1,109 @@
+import os
+import json
+import faiss
+import numpy as np
+
+# --- Configuration ---
+# Index type for new builds: flat (exact), ivf, hnsw, pq or ivfpq. Loading
+# always uses the configuration stored next to the index instead.
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", 256))
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", 16))
+VECTOR_INDEX_HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", 32))
+VECTOR_INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", 80))
+VECTOR_INDEX_HNSW_EF_SEARCH = int(os.getenv("VECTOR_INDEX_HNSW_EF_SEARCH", 64))
+VECTOR_INDEX_PQ_M = int(os.getenv("VECTOR_INDEX_PQ_M", 48))
+VECTOR_INDEX_PQ_BITS = int(os.getenv("VECTOR_INDEX_PQ_BITS", 8))
+
+INDEX_CONFIG_FILE = "index_config.json"
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq", "ivfpq")
+
+# k-means wants roughly this many training points per IVF list
+MIN_POINTS_PER_LIST = 39
+
+def default_index_config(index_type: str = None) -> dict:
+    """The build configuration from the environment, optionally for another index type."""
+    return {
+        "type": (index_type or VECTOR_INDEX_TYPE).lower(),
+        "nlist": VECTOR_INDEX_NLIST,
+        "nprobe": VECTOR_INDEX_NPROBE,
+        "hnsw_m": VECTOR_INDEX_HNSW_M,
+        "ef_construction": VECTOR_INDEX_HNSW_EF_CONSTRUCTION,
+        "ef_search": VECTOR_INDEX_HNSW_EF_SEARCH,
+        "pq_m": VECTOR_INDEX_PQ_M,
+        "pq_bits": VECTOR_INDEX_PQ_BITS,
+    }
+
+def _fit_to_corpus(config: dict, dimension: int, count: int) -> dict:
+    """Shrinks parameters a small corpus can't train, so a build never fails on size alone."""
+    config = dict(config)
+    if config["type"] in ("ivf", "ivfpq"):
+        nlist = max(1, min(config["nlist"], count // MIN_POINTS_PER_LIST))
+        if nlist != config["nlist"]:
+            print(f"  - ⚠️ Only {count} vectors: using nlist={nlist} instead of {config['nlist']}.")
+        config["nlist"] = nlist
+        config["nprobe"] = min(config["nprobe"], nlist)
+    if config["type"] in ("pq", "ivfpq"):
+        if dimension % config["pq_m"]:
+            raise ValueError(f"PQ sub-quantizers (pq_m={config['pq_m']}) must divide the dimension {dimension}.")
+        pq_bits = config["pq_bits"]
+        while pq_bits > 1 and 2 ** pq_bits > count:
+            pq_bits -= 1
+        if pq_bits != config["pq_bits"]:
+            print(f"  - ⚠️ Only {count} vectors: using {pq_bits}-bit PQ codes instead of {config['pq_bits']}.")
+        config["pq_bits"] = pq_bits
+    return config
+
+def build_index(vectors: np.ndarray, config: dict):
+    """
+    Builds, trains and fills a FAISS index of the configured type over `vectors`
+    (L2 metric, like LangChain's default flat index). Returns (index, config)
+    where config has been adjusted to what the corpus could support.
+    """
+    if config["type"] not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{config['type']}'. Choose one of: {', '.join(INDEX_TYPES)}.")
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    count, dimension = vectors.shape
+    config = _fit_to_corpus(config, dimension, count)
+
+    index_type = config["type"]
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dimension)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config["hnsw_m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+    elif index_type == "ivf":
+        index = faiss.index_factory(dimension, f"IVF{config['nlist']},Flat")
+    elif index_type == "pq":
+        index = faiss.index_factory(dimension, f"PQ{config['pq_m']}x{config['pq_bits']}")
+    else:
+        index = faiss.index_factory(dimension, f"IVF{config['nlist']},PQ{config['pq_m']}x{config['pq_bits']}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index, config)
+    return index, config
+
+def apply_search_params(index, config: dict):
+    """Sets the query-time knobs (nprobe, efSearch), which aren't reliably persisted with the index."""
+    if config["type"] in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(index).nprobe = config["nprobe"]
+    elif config["type"] == "hnsw":
+        index.hnsw.efSearch = config["ef_search"]
+
+def index_memory_bytes(index) -> int:
+    """Size of the serialized index, a close proxy for its resident memory."""
+    return int(faiss.serialize_index(index).nbytes)
+
+def save_index_config(store_path: str, config: dict):
+    with open(os.path.join(store_path, INDEX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+def load_index_config(store_path: str) -> dict:
+    """The stored build configuration, or the flat default for stores built before it was recorded."""
+    path = os.path.join(store_path, INDEX_CONFIG_FILE)
+    if not os.path.exists(path):
+        return default_index_config("flat")
+    with open(path, "r", encoding="utf-8") as f:
+        return {**default_index_config("flat"), **json.load(f)}
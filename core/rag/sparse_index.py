@@ -0,0 +1,100 @@
+import os
+import re
+import json
+import math
+import heapq
+from collections import Counter
+
+# --- Configuration ---
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+SPARSE_INDEX_FILE = "sparse_index.json"
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of",
+    "on", "or", "that", "the", "this", "to", "was", "were", "what", "which", "who", "with",
+}
+
+def tokenize(text: str) -> list[str]:
+    # Keeps alphanumeric runs intact, so course codes like "ue20cs301" stay one term
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+class SparseIndex:
+    """
+    A BM25 inverted index over the vector store's chunks, keyed by the same
+    docstore IDs as the FAISS index. Catches exact terms (course codes,
+    lecturer names) that MiniLM embeddings blur.
+    """
+    def __init__(self, doc_ids: list, doc_lengths: list, postings: dict, k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Args:
+            doc_ids (list): Docstore ID of each indexed chunk.
+            doc_lengths (list): Token count of each chunk, by position.
+            postings (dict): term -> {position: term frequency}.
+        """
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, items) -> "SparseIndex":
+        """Builds the index from (doc_id, text) pairs."""
+        doc_ids, doc_lengths, postings = [], [], {}
+        for position, (doc_id, text) in enumerate(items):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings.setdefault(term, {})[position] = frequency
+        return cls(doc_ids, doc_lengths, postings)
+
+    def save(self, store_path: str):
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": {term: list(docs.items()) for term, docs in self.postings.items()},
+        }
+        with open(os.path.join(store_path, SPARSE_INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, store_path: str):
+        """Loads the persisted index, or returns None if there is none."""
+        path = os.path.join(store_path, SPARSE_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {term: {position: frequency for position, frequency in docs} for term, docs in data["postings"].items()}
+        return cls(data["doc_ids"], data["doc_lengths"], postings, data["k1"], data["b"])
+
+    def search(self, query: str, k: int) -> list[tuple]:
+        """Returns up to k (doc_id, score) pairs, best first."""
+        total = len(self.doc_ids)
+        if not total:
+            return []
+        scores = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for position, frequency in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / (self.avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[position], score) for position, score in best]
+
+def reciprocal_rank_fusion(rankings: list, k: int, rrf_k: int = 60) -> list:
+    """Merges ranked ID lists: each ranking adds 1 / (rrf_k + rank) to an ID's score. Returns the top k IDs."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
@@ -5,6 +5,7 @@ from openai import OpenAI
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from core.db.database import Lecturer
+from core.pipeline.data_version import bump_data_version
 
 # --- Initialization ---
 load_dotenv()
@@ -147,6 +148,7 @@ def process_faculty_pdf_to_db(pdf_path: str, db: Session):
             
             db.commit()
             print(f"  - Successfully saved {len(final_data)} unique lecturers to the database.")
+            bump_data_version("faculty PDF ingestion")
             
             # Clean up the checkpoint file on success
             if os.path.exists(CHECKPOINT_FILE):
@@ -1,8 +1,73 @@
 import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 from typing import List
+from core.rag.index_factory import (
+    build_index, apply_search_params, default_index_config, save_index_config, load_index_config
+)
+from core.rag.sparse_index import SparseIndex, reciprocal_rank_fusion
+
+# --- Configuration ---
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+# dense: FAISS only. hybrid: FAISS and BM25 rankings fused with reciprocal rank fusion.
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "hybrid").lower()
+VECTOR_SEARCH_TOP_K = int(os.getenv("VECTOR_SEARCH_TOP_K", 5))
+# Candidates taken from each ranking before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 20))
+RRF_K = int(os.getenv("RRF_K", 60))
+
+class CachedQueryEmbeddings:
+    """
+    A bounded LRU of normalized query text -> embedding in front of a LangChain
+    embeddings object. Misses in a batch are encoded in one forward pass. Drop-in
+    for the embeddings object wherever queries (not documents) are embedded.
+    """
+    def __init__(self, embeddings, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(text: str) -> str:
+        # MiniLM is uncased, so case and spacing don't change the embedding
+        return " ".join(text.lower().split())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            hits = sum(1 for key in keys if key in found)
+            self.stats["hits"] += hits
+            self.stats["misses"] += len(keys) - hits
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing:
+            vectors = self.embeddings.embed_documents(missing)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._cache), "max_entries": self.max_entries}
 
 class VectorStore:
     def __init__(self, store_path: str):
@@ -13,6 +78,15 @@ class VectorStore:
             model_kwargs={'device': 'cpu'},
             encode_kwargs={'normalize_embeddings': True}
         )
+        # Queries repeat across plan steps, the semantic cache and the router
+        self.query_embeddings = CachedQueryEmbeddings(self.embeddings)
+        self._stats_lock = threading.Lock()
+        self.search_stats = {"calls": 0, "queries": 0, "wall_ms": 0.0, "cpu_ms": 0.0}
+        self.index_config = default_index_config("flat")
+        # The BM25 index is loaded (or rebuilt from the docstore) on first use
+        self._sparse_lock = threading.Lock()
+        self._sparse_index = None
+        self._sparse_loaded = False
         self.db = self._load_store()
 
     def _load_store(self):
@@ -20,42 +94,220 @@ class VectorStore:
         if os.path.exists(self.store_path):
             print(f"  - Loading existing vector store from: {self.store_path}")
             try:
-                return FAISS.load_local(self.store_path, self.embeddings, allow_dangerous_deserialization=True)
+                db = FAISS.load_local(self.store_path, self.embeddings, allow_dangerous_deserialization=True)
+                # The index file holds the structure; query-time parameters come from the stored config
+                self.index_config = load_index_config(self.store_path)
+                apply_search_params(db.index, self.index_config)
+                print(f"  - Index type: {self.index_config['type']} ({db.index.ntotal} vectors)")
+                return db
             except Exception as e:
                 print(f"  - Error loading vector store: {e}. A new one will be created if you build it.")
                 return None
         else:
             return None
 
-    def build_from_chunks(self, chunks: List[Document]):
+    def build_from_chunks(self, chunks: List[Document], index_config: dict = None, ids: List[str] = None):
         """
         Builds a new FAISS vector store from a list of document chunks
-        and saves it to the specified path.
+        and saves it to the specified path, together with the index
+        configuration (see core.rag.index_factory; defaults to VECTOR_INDEX_*).
+        `ids` are optional stable chunk IDs, needed to delete chunks later.
+        Returns True if the store was built and saved.
         """
         if not chunks:
             print("Warning: No chunks provided to build the vector store.")
-            return
+            return False
             
-        print(f"  - Building vector store with {len(chunks)} chunks...")
+        index_config = index_config or default_index_config()
+        print(f"  - Building {index_config['type']} vector store with {len(chunks)} chunks...")
         try:
-            db = FAISS.from_documents(chunks, self.embeddings)
-            db.save_local(self.store_path)
-            self.db = db
+            self.clear()
+            self.add_chunks(chunks, ids)
+            self.reindex(index_config)
+            self.save()
             print(f"  - Vector store successfully built and saved to {self.store_path}")
+            return True
         except Exception as e:
             print(f"  - 🚨 An error occurred while building the vector store: {e}")
+            self.clear()
+            return False
+
+    def clear(self):
+        """Drops the in-memory store (not the files) so the next add_chunks starts a new flat one."""
+        self.db = None
+        self.index_config = default_index_config("flat")
+        self._invalidate_sparse()
 
-    def search(self, query: str, k: int = 5) -> List[str]:
+    def add_chunks(self, chunks: List[Document], ids: List[str] = None):
+        """Embeds and appends chunks under the given IDs, starting a flat store if there is none. Call save() after."""
+        if not chunks:
+            return
+        self._invalidate_sparse()
+        if self.db is None:
+            self.db = FAISS.from_documents(chunks, self.embeddings, ids=ids)
+            self.index_config = default_index_config("flat")
+            return
+        self.db.add_documents(chunks, ids=ids)
+
+    def reindex(self, index_config: dict):
+        """
+        Converts a flat store to the configured index type, reusing the stored
+        embeddings; positions (and so the docstore mapping) stay the same.
         """
-        Performs a similarity search on the vector store.
+        if self.db is None or index_config["type"] == "flat" or self.index_config["type"] != "flat":
+            return
+        vectors = self.db.index.reconstruct_n(0, self.db.index.ntotal)
+        try:
+            self.db.index, self.index_config = build_index(vectors, index_config)
+        except ValueError as e:
+            print(f"  - ⚠️ {e} Keeping the flat index.")
+
+    def delete_chunks(self, ids: List[str]) -> bool:
+        """
+        Removes chunks by ID. Returns False for anything but a flat index, in
+        which case the caller should rebuild. Call save() after.
+        """
+        if not ids or self.db is None:
+            return True
+        # LangChain renumbers the docstore mapping as if removed ids shift down,
+        # which only a flat index does; IVF keeps its ids and HNSW can't remove.
+        if self.index_config["type"] != "flat":
+            print(f"  - ⚠️ The {self.index_config['type']} index can't delete chunks in place.")
+            return False
+        try:
+            self.db.delete(ids)
+            self._invalidate_sparse()
+            return True
+        except Exception as e:
+            print(f"  - ⚠️ Could not delete {len(ids)} chunks from the {self.index_config['type']} index: {e}")
+            return False
+
+    def save(self):
+        """Writes the current store, its index configuration and a fresh BM25 index to disk."""
+        if self.db is None:
+            return
+        self.db.save_local(self.store_path)
+        save_index_config(self.store_path, self.index_config)
+        sparse_index = SparseIndex.build(self._docstore_items())
+        sparse_index.save(self.store_path)
+        with self._sparse_lock:
+            self._sparse_index, self._sparse_loaded = sparse_index, True
+
+    def _invalidate_sparse(self):
+        with self._sparse_lock:
+            self._sparse_index, self._sparse_loaded = None, False
+
+    def _docstore_items(self) -> list:
+        """(doc_id, text) for every chunk, in index order."""
+        return [(doc_id, self.db.docstore.search(doc_id).page_content)
+                for doc_id in self.db.index_to_docstore_id.values()]
+
+    @property
+    def sparse_index(self):
+        """
+        The BM25 index over the same chunks, or None without a store. Stores
+        saved before it existed get one built in memory from the docstore.
+        """
+        with self._sparse_lock:
+            if not self._sparse_loaded:
+                self._sparse_loaded = True
+                if self.db is not None:
+                    try:
+                        self._sparse_index = SparseIndex.load(self.store_path)
+                    except Exception as e:
+                        print(f"  - ⚠️ Could not load the BM25 index: {e}")
+                    if self._sparse_index is None:
+                        print("  - Building the BM25 index from the docstore (rebuild the store to persist it)...")
+                        self._sparse_index = SparseIndex.build(self._docstore_items())
+            return self._sparse_index
+
+    def _record_search(self, queries: int, wall_start: float, cpu_start: float):
+        wall_ms = (time.perf_counter() - wall_start) * 1000
+        # Process-wide CPU time, so it includes FAISS/torch worker threads
+        cpu_ms = (time.process_time() - cpu_start) * 1000
+        with self._stats_lock:
+            self.search_stats["calls"] += 1
+            self.search_stats["queries"] += queries
+            self.search_stats["wall_ms"] += wall_ms
+            self.search_stats["cpu_ms"] += cpu_ms
+        print(f"  - ⏱️ Vector search: {queries} quer{'y' if queries == 1 else 'ies'} in {wall_ms:.1f} ms (CPU {cpu_ms:.1f} ms)")
+
+    def _dense_ids(self, queries: List[str], k: int) -> List[List[str]]:
+        """One batched encode and a single FAISS search; returns docstore IDs per query."""
+        if self.db is None:
+            raise RuntimeError("Vector store is not loaded or built.")
+        vectors = np.array(self.query_embeddings.embed_documents(queries), dtype="float32")
+        _, indices = self.db.index.search(vectors, k)
+        return [[self.db.index_to_docstore_id[int(i)] for i in row if i != -1] for row in indices]
+
+    def _texts(self, doc_ids: List[str]) -> List[str]:
+        texts = []
+        for doc_id in doc_ids:
+            doc = self.db.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                texts.append(doc.page_content)
+        return texts
+
+    def search_faiss(self, query: str, k: int = VECTOR_SEARCH_TOP_K) -> List[str]:
+        """Dense-only search. Raises if FAISS can't answer (see core.utils.retrieval)."""
+        return self._texts(self._dense_ids([query], k)[0])
+
+    def search_bm25(self, query: str, k: int = VECTOR_SEARCH_TOP_K) -> List[str]:
+        """BM25-only search over the chunk texts."""
+        sparse_index = self.sparse_index
+        if sparse_index is None:
+            return []
+        return self._texts([doc_id for doc_id, _ in sparse_index.search(query, k)])
+
+    def search(self, query: str, k: int = VECTOR_SEARCH_TOP_K) -> List[str]:
+        """
+        Performs a search on the vector store in the configured VECTOR_SEARCH_MODE.
+        """
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: List[str], k: int = VECTOR_SEARCH_TOP_K, mode: str = None) -> List[List[str]]:
+        """
+        Searches several queries at once: one batched encode for the uncached
+        queries and a single FAISS search for all of them. In hybrid mode the
+        top HYBRID_CANDIDATES of FAISS and BM25 are fused with RRF, so chunks
+        that match exact terms (course codes, names) rise to the top. Returns
+        one list of chunks per query, in order.
         """
         if self.db is None:
             print("Error: Vector store is not loaded or built. Cannot perform search.")
+            return [[] for _ in queries]
+        if not queries:
             return []
-        
+
+        mode = (mode or VECTOR_SEARCH_MODE).lower()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
         try:
-            results = self.db.similarity_search(query, k=k)
-            return [doc.page_content for doc in results]
+            sparse_index = self.sparse_index if mode == "hybrid" else None
+            if sparse_index is None:
+                return [self._texts(ids) for ids in self._dense_ids(queries, k)]
+            candidates = max(k, HYBRID_CANDIDATES)
+            results = []
+            for query, dense_ids in zip(queries, self._dense_ids(queries, candidates)):
+                sparse_ids = [doc_id for doc_id, _ in sparse_index.search(query, candidates)]
+                results.append(self._texts(reciprocal_rank_fusion([dense_ids, sparse_ids], k, RRF_K)))
+            return results
         except Exception as e:
             print(f"An error occurred during vector search: {e}")
-            return []
+            return [[] for _ in queries]
+        finally:
+            self._record_search(len(queries), wall_start, cpu_start)
+
+    def snapshot(self) -> dict:
+        """Search latency/CPU totals and query-embedding cache counters."""
+        with self._stats_lock:
+            stats = dict(self.search_stats)
+        calls = stats["calls"]
+        stats["avg_wall_ms"] = round(stats["wall_ms"] / calls, 2) if calls else None
+        stats["avg_cpu_ms"] = round(stats["cpu_ms"] / calls, 2) if calls else None
+        stats["wall_ms"], stats["cpu_ms"] = round(stats["wall_ms"], 1), round(stats["cpu_ms"], 1)
+        return {
+            "index_type": self.index_config["type"],
+            "search_mode": VECTOR_SEARCH_MODE,
+            "search": stats,
+            "query_embedding_cache": self.query_embeddings.snapshot(),
+        }
@@ -1,6 +1,7 @@
 # utils/retrieval.py
 
 def search_faiss_with_fallback(query, vector_store, top_k=5):
+    """Dense search, falling back to the BM25 index when FAISS fails."""
     try:
         return vector_store.search_faiss(query, top_k)
     except Exception as e:
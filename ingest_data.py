@@ -3,6 +3,7 @@ import pandas as pd
 import re
 import shutil
 from core.db.database import engine
+from core.pipeline.data_version import bump_data_version
 
 # --- Configuration ---
 STAGING_PATH = "data/staging"
@@ -35,6 +36,7 @@ def ingest_data():
         print("✅ No new CSV files found in the staging directory.")
         return
 
+    ingested_any = False
     for filename in files_to_process:
         try:
             file_path = os.path.join(STAGING_PATH, filename)
@@ -51,11 +53,14 @@ def ingest_data():
 
             # Move the processed file to the archive
             shutil.move(file_path, os.path.join(ARCHIVE_PATH, filename))
+            ingested_any = True
             print(f"    - Successfully ingested. Moved '{filename}' to archive.")
 
         except Exception as e:
             print(f"❌ Error processing '{filename}': {e}")
 
+    if ingested_any:
+        bump_data_version("CSV ingestion")
     print("✅ Data ingestion process finished.")
 
 if __name__ == "__main__":
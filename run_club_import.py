@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from core.db.database import get_db, Club
 import numpy as np
 import sys
+from core.pipeline.data_version import bump_data_version
 
 def import_clubs_csv_to_db(csv_path: str, db: Session):
     """
@@ -42,6 +43,7 @@ def import_clubs_csv_to_db(csv_path: str, db: Session):
         # 5. Commit all the new records
         db.commit()
         print(f"\nSuccessfully imported {len(df)} clubs into the database.")
+        bump_data_version("clubs import")
 
     except FileNotFoundError:
         print(f"Error: The file was not found at {csv_path}", file=sys.stderr)
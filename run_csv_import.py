@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from core.db.database import get_db, Lecturer
 import numpy as np
 import sys
+from core.pipeline.data_version import bump_data_version
 
 def import_csv_to_db(csv_path: str, db: Session):
     """
@@ -41,6 +42,7 @@ def import_csv_to_db(csv_path: str, db: Session):
         # 5. Commit all the new records to the database
         db.commit()
         print(f"\nSuccessfully imported {len(df)} lecturers into the database.")
+        bump_data_version("lecturers import")
 
     except FileNotFoundError:
         print(f"Error: The file was not found at {csv_path}", file=sys.stderr)
@@ -0,0 +1,58 @@
+from core.pipeline.answer_renderer import render_answer, NO_DATA_ANSWER
+
+
+def result(columns, rows, truncated=False, total_rows=None):
+    return {"columns": columns, "rows": rows, "total_rows": len(rows) if total_rows is None else total_rows,
+            "truncated": truncated}
+
+
+def test_count_sentence():
+    answer = render_answer("How many lecturers are in CSE?", result(["count"], [(12,)]))
+    assert answer == "There are 12 lecturers."
+    assert render_answer("How many clubs are there?", result(["count"], [(1,)])) == "There is 1 club."
+
+
+def test_single_value_and_empty_results():
+    assert render_answer("What is Dr. Rao's designation?", result(["designation"], [("Professor",)])) == "Designation: Professor"
+    assert render_answer("Anything?", result(["name"], [])) == NO_DATA_ANSWER
+    assert render_answer("Anything?", result(["name"], [(None,)])) == NO_DATA_ANSWER
+
+
+def test_single_lecturer_card():
+    answer = render_answer(
+        "Tell me about Dr. Rao",
+        result(["id", "name", "role", "teaching_subjects", "education"],
+               [(1, "Dr. Asha Rao", "Professor", "Data Structures", "")]),
+    )
+    assert answer == "**Dr. Asha Rao**\n- Role: Professor\n- Teaches: Data Structures"
+
+
+def test_several_club_cards():
+    answer = render_answer(
+        "Which clubs recruit in August?",
+        result(["name", "category", "recruitment_time"], [("Robotics", "Technical", "August"), ("Music", "Cultural", "August")]),
+    )
+    assert answer.startswith("I found 2 matching clubs:\n\n**Robotics**\n- Category: Technical")
+    assert "**Music**\n- Category: Cultural\n- Recruitment time: August" in answer
+
+
+def test_short_list():
+    answer = render_answer("List the lecturers in CSE", result(["name"], [("Dr. Rao",), ("Dr. Meena",)]))
+    assert answer == "Here are the matching results (name):\n- Dr. Rao\n- Dr. Meena"
+
+
+def test_truncated_list_says_more_without_a_count():
+    # The query's LIMIT means only one row past the cap was ever counted
+    answer = render_answer(
+        "List the lecturers in CSE", result(["name"], [("Dr. Rao",), ("Dr. Meena",)], truncated=True, total_rows=3)
+    )
+    assert answer.endswith("- Dr. Meena\n- ...and more not shown")
+    assert "1 more" not in answer
+
+
+def test_results_that_need_the_synthesizer():
+    wide = result(["name", "department", "office"], [("Dr. Rao", "CSE", "B-201"), ("Dr. Meena", "ECE", "C-101")])
+    assert render_answer("Where do they sit?", wide) is None
+    long_list = result(["name"], [(f"Lecturer {i}",) for i in range(11)])
+    assert render_answer("List everyone", long_list) is None
+    assert render_answer("Anything?", None) is None
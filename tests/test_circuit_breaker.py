@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+import pytest
+from core.llm import circuit_breaker
+from core.llm.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_opens_after_the_failure_threshold(clock):
+    breaker = CircuitBreaker("google", failure_threshold=3, cooldown_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["total_rejections"] == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("google", failure_threshold=3, cooldown_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_half_open_lets_one_trial_through_after_the_cooldown(clock):
+    breaker = CircuitBreaker("google", failure_threshold=3, cooldown_seconds=30)
+    open_breaker(breaker)
+
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.allow_request()
+
+
+def test_successful_trial_closes_the_circuit(clock):
+    breaker = CircuitBreaker("google", failure_threshold=3, cooldown_seconds=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_failed_trial_reopens_for_another_cooldown(clock):
+    breaker = CircuitBreaker("google", failure_threshold=3, cooldown_seconds=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["retry_in_seconds"] == 30
+    clock.now += 30
+    assert breaker.allow_request()
+
+
+def test_cancelled_trial_frees_the_slot(clock):
+    breaker = CircuitBreaker("google", failure_threshold=3, cooldown_seconds=30)
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
@@ -0,0 +1,55 @@
+from core.pipeline.context_assembler import ContextAssembler, count_tokens
+
+SHARED = "The robotics club meets every Friday evening in the mechanical block lab. "
+
+
+def test_duplicate_and_contained_chunks_are_dropped():
+    chunks = ["Dr. Rao teaches Data Structures.", "dr. rao   teaches data structures.", "Dr. Rao teaches"]
+    context, report = ContextAssembler("REASONER", budget_tokens=1000).assemble_chunks(chunks)
+    assert context == "Dr. Rao teaches Data Structures."
+    assert report["items_in"] == 3
+    assert report["items_out"] == 1
+    assert report["duplicates_dropped"] == 2
+
+
+def test_overlapping_head_is_trimmed():
+    first = "Clubs at PES. " + SHARED
+    second = SHARED + "New members are recruited in August."
+    context, _ = ContextAssembler("REASONER", budget_tokens=1000).assemble_chunks([first, second], separator="\n---\n")
+    assert context == first + "\n---\n" + "New members are recruited in August."
+
+
+def test_lower_ranked_chunks_are_dropped_over_budget():
+    chunks = [f"Chunk {i}: " + "word " * 40 for i in range(5)]
+    budget = count_tokens(chunks[0]) * 2 + 10
+    context, report = ContextAssembler("REASONER", budget_tokens=budget).assemble_chunks(chunks)
+    assert context.startswith("Chunk 0") and "Chunk 1" in context and "Chunk 2" not in context
+    assert report["items_out"] == 2
+    assert report["tokens_out"] <= budget == report["budget"]
+
+
+def test_first_chunk_is_truncated_rather_than_dropped():
+    context, report = ContextAssembler("REASONER", budget_tokens=20).assemble_chunks(["word " * 200])
+    assert context.endswith("…[truncated]")
+    assert report["items_out"] == 1
+    assert report["tokens_out"] <= 20 + count_tokens(" …[truncated]")
+
+
+def test_sections_share_the_budget_so_small_ones_survive():
+    sections = ["Step 1: 3 lecturers.", "Step 2: " + "long result " * 500, "Step 3: the club meets on Friday."]
+    context, report = ContextAssembler("SYNTHESIZER", budget_tokens=200).assemble_sections(sections)
+    assert "Step 1: 3 lecturers." in context
+    assert "Step 3: the club meets on Friday." in context
+    assert "…[truncated]" in context
+    assert report["tokens_in"] > 1000
+    assert report["tokens_out"] <= 200 + 3 * count_tokens(" …[truncated]")
+
+
+def test_repeated_long_lines_are_kept_once_across_sections():
+    line = "Dr. Rao is an associate professor in the CSE department since 2015."
+    sections = [f"Step 1:\n{line}", f"Step 2:\n{line}\nShe teaches UE20CS301."]
+    context, report = ContextAssembler("SYNTHESIZER", budget_tokens=1000).assemble_sections(sections)
+    assert context.count(line) == 1
+    assert "She teaches UE20CS301." in context
+    assert report["duplicates_dropped"] == 1
+    assert set(report) == {"role", "items_in", "items_out", "duplicates_dropped", "tokens_in", "tokens_out", "budget"}
@@ -0,0 +1,147 @@
+import asyncio
+import time
+import pytest
+from core.llm import llm_client
+from core.llm.circuit_breaker import CircuitBreaker
+from core.llm.latency_tracker import LatencyTracker
+
+ROLE = "SYNTHESIZER"  # Not a cached role, so every call reaches a provider
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(llm_client, "latency_tracker", LatencyTracker())
+    for provider in llm_client.PROVIDER_CALLS:
+        monkeypatch.setitem(llm_client.circuit_breakers, provider, CircuitBreaker(provider, 3, 30))
+    monkeypatch.setattr(llm_client, "PRIMARY_PROVIDER", "google")
+    monkeypatch.setattr(llm_client, "FALLBACK_PROVIDER", "anthropic")
+    return llm_client
+
+
+def test_astream_response_reraises_errors_that_end_the_stream(llm, monkeypatch):
+    async def broken_stream(prompt, role, counter=None):
+        yield "partial "
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(llm, "_stream", broken_stream)
+
+    async def consume(deltas):
+        async for delta in llm.astream_response("prompt", ROLE):
+            deltas.append(delta)
+
+    deltas = []
+    with pytest.raises(RuntimeError, match="connection reset"):
+        asyncio.run(consume(deltas))
+    assert deltas == ["partial "]
+
+
+class FakeProvider:
+    """Stands in for a provider's API call: answers after `delay`, or raises `error`."""
+    def __init__(self, answer="", delay=0.0, error=None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.started_at = []
+        self.cancelled = False
+
+    async def __call__(self, prompt):
+        self.started_at.append(time.perf_counter())
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def hedging(llm, monkeypatch):
+    monkeypatch.setattr(llm, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(llm, "HEDGE_MIN_SAMPLES", 20)
+    monkeypatch.setattr(llm, "HEDGE_DEFAULT_DELAY", 5)
+
+    def install(primary, fallback, primary_p95=None):
+        monkeypatch.setitem(llm.PROVIDER_CALLS, "google", primary)
+        monkeypatch.setitem(llm.PROVIDER_CALLS, "anthropic", fallback)
+        if primary_p95 is not None:
+            for _ in range(20):
+                llm.latency_tracker.record(ROLE, "google", primary_p95)
+    return install
+
+
+def test_hedge_fires_after_the_primary_percentile_delay(llm, hedging):
+    primary, fallback = FakeProvider("slow", delay=3), FakeProvider("fast")
+    hedging(primary, fallback, primary_p95=0.1)
+
+    assert llm.generate_response("prompt", ROLE) == "fast"
+    hedge_after = fallback.started_at[0] - primary.started_at[0]
+    # The learned p95 (0.1s) is used, not the 5s default
+    assert 0.08 <= hedge_after < 1.0
+
+
+def test_no_hedge_when_the_primary_answers_in_time(llm, hedging):
+    primary, fallback = FakeProvider("primary", delay=0.01), FakeProvider("fallback")
+    hedging(primary, fallback, primary_p95=0.5)
+
+    with llm.count_round_trips() as round_trips:
+        assert llm.generate_response("prompt", ROLE) == "primary"
+    assert fallback.started_at == []
+    assert round_trips["total"] == 1
+
+
+def test_first_success_wins_and_the_loser_is_cancelled(llm, hedging):
+    primary, fallback = FakeProvider("primary", delay=3), FakeProvider("fallback", delay=0.05)
+    hedging(primary, fallback, primary_p95=0.05)
+
+    assert llm.generate_response("prompt", ROLE) == "fallback"
+    assert wait_until(lambda: primary.cancelled)
+
+
+def test_primary_can_still_win_after_the_hedge(llm, hedging):
+    primary, fallback = FakeProvider("primary", delay=0.2), FakeProvider("fallback", delay=3)
+    hedging(primary, fallback, primary_p95=0.05)
+
+    assert llm.generate_response("prompt", ROLE) == "primary"
+    assert wait_until(lambda: fallback.cancelled)
+
+
+def test_hedged_requests_count_as_two_round_trips(llm, hedging):
+    primary, fallback = FakeProvider("slow", delay=3), FakeProvider("fast")
+    hedging(primary, fallback, primary_p95=0.05)
+
+    with llm.count_round_trips() as round_trips:
+        llm.generate_response("prompt", ROLE)
+    assert round_trips["total"] == 2
+    assert round_trips["by_role"] == {ROLE: 2}
+
+
+def test_failed_hedge_falls_back_to_the_other_answer(llm, hedging):
+    primary, fallback = FakeProvider("primary", delay=0.3), FakeProvider(error=RuntimeError("503"))
+    hedging(primary, fallback, primary_p95=0.05)
+
+    assert llm.generate_response("prompt", ROLE) == "primary"
+
+
+def test_open_circuit_skips_the_primary(llm, monkeypatch):
+    primary, fallback = FakeProvider(error=RuntimeError("500")), FakeProvider("fallback")
+    monkeypatch.setitem(llm.PROVIDER_CALLS, "google", primary)
+    monkeypatch.setitem(llm.PROVIDER_CALLS, "anthropic", fallback)
+
+    for _ in range(3):
+        assert llm.generate_response("prompt", ROLE) == "fallback"
+    assert llm.circuit_breakers["google"].state == "open"
+
+    with llm.count_round_trips() as round_trips:
+        assert llm.generate_response("prompt", ROLE) == "fallback"
+    # The primary isn't called while its circuit is open, so only one round trip
+    assert len(primary.started_at) == 3
+    assert round_trips["total"] == 1
@@ -0,0 +1,57 @@
+import threading
+from core.pipeline.plan_executor import PlanExecutor, build_dependency_graph, substitute_placeholders
+
+
+def step(num, sub_query, tool="VectorSearch"):
+    return {"step": num, "thought": f"step {num}", "tool": tool, "sub_query": sub_query}
+
+
+def test_dependency_graph_reads_placeholders():
+    plan = [
+        step(1, "Who heads the CSE department?"),
+        step(2, "Which clubs does {{step_1_result}} coordinate?"),
+        step(3, "Compare {{step_1_result}} and {{step_2_result}}"),
+    ]
+    assert build_dependency_graph(plan) == [set(), {0}, {0, 1}]
+
+
+def test_dependency_graph_ignores_unknown_and_forward_references():
+    plan = [step(1, "Use {{step_2_result}}"), step(2, "Use {{step_9_result}}")]
+    assert build_dependency_graph(plan) == [set(), set()]
+
+
+def test_substitute_placeholders_quotes_results():
+    assert substitute_placeholders("Office of {{step_1_result}}?", {1: "Dr. Rao"}) == 'Office of "Dr. Rao"?'
+    # Missing or empty results leave the placeholder in place
+    assert substitute_placeholders("Office of {{step_2_result}}?", {2: ""}) == "Office of {{step_2_result}}?"
+
+
+def test_events_are_in_plan_order_with_resolved_queries():
+    plan = [step(1, "Who heads CSE?"), step(2, "Office of {{step_1_result}}")]
+    events = list(PlanExecutor(lambda tool, sub_query: f"answer to {sub_query}").run(plan))
+
+    assert [(e["type"], e["step"]) for e in events] == [
+        ("step_started", 1), ("step_finished", 1), ("step_started", 2), ("step_finished", 2),
+    ]
+    assert events[3]["sub_query"] == 'Office of "answer to Who heads CSE?"'
+    assert events[3]["result"] == 'answer to Office of "answer to Who heads CSE?"'
+    assert all(e["elapsed"] >= 0 for e in events if e["type"] == "step_finished")
+
+
+def test_forward_reference_is_not_resolved():
+    plan = [step(1, "Use {{step_2_result}}"), step(2, "Second")]
+    events = list(PlanExecutor(lambda tool, sub_query: "done").run(plan))
+    assert events[0]["sub_query"] == "Use {{step_2_result}}"
+
+
+def test_independent_steps_run_concurrently():
+    # Both steps wait on each other, so this only finishes if they overlap
+    barrier = threading.Barrier(2, timeout=5)
+
+    def run_step(tool, sub_query):
+        barrier.wait()
+        return sub_query.upper()
+
+    plan = [step(1, "first"), step(2, "second")]
+    results = [e["result"] for e in PlanExecutor(run_step, max_workers=2).run(plan) if e["type"] == "step_finished"]
+    assert results == ["FIRST", "SECOND"]
@@ -0,0 +1,98 @@
+import sys
+import types
+import importlib
+from contextlib import contextmanager
+import pytest
+
+
+@pytest.fixture
+def router_module(monkeypatch, tmp_path):
+    # core.db.database connects to Postgres on import; the router only needs `engine`
+    database = types.ModuleType("core.db.database")
+    database.engine = None
+    monkeypatch.setitem(sys.modules, "core.db.database", database)
+    monkeypatch.delitem(sys.modules, "core.pipeline.query_router", raising=False)
+    module = importlib.import_module("core.pipeline.query_router")
+    monkeypatch.setattr(module, "get_data_version", lambda: "1")
+    return module
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [0.0, 1.0]
+
+
+class FakeEngine:
+    def __init__(self, rows_by_table=None, error=None):
+        self.rows_by_table = rows_by_table or {}
+        self.error = error
+        self.connects = 0
+
+    @contextmanager
+    def connect(self):
+        self.connects += 1
+        if self.error:
+            raise self.error
+        yield self
+
+    def execute(self, statement):
+        table = str(statement).rsplit(" ", 1)[-1]
+        return [(name,) for name in self.rows_by_table.get(table, [])]
+
+
+def make_router(module, monkeypatch, engine):
+    monkeypatch.setattr(module, "engine", engine)
+    router = module.QueryRouter(FakeEmbeddings(), examples=[{"query": "x", "tool": "SQL"}])
+    # Keep the classifier out of rule tests
+    monkeypatch.setattr(router, "_classify", lambda query: None)
+    return router
+
+
+@pytest.mark.parametrize("query", [
+    "Who is Dr. Sandesh BJ?",
+    "Tell me about Prof Rao",
+    "What does Mrs. Sharma teach?",
+])
+def test_title_pattern_matches_titled_names(router_module, query):
+    assert router_module.TITLE_PATTERN.search(query)
+
+
+@pytest.mark.parametrize("query", [
+    "What are the MS admission requirements?",
+    "Is there an MS program in data science?",
+    "Who is the professor in charge of placements?",
+    "Show me all professors",
+])
+def test_title_pattern_ignores_degrees_and_roles(router_module, query):
+    assert not router_module.TITLE_PATTERN.search(query)
+
+
+def test_greeting_is_answered_directly(router_module, monkeypatch):
+    router = make_router(router_module, monkeypatch, FakeEngine())
+    route = router.route("Hello there!")
+    assert route["kind"] == "greeting" and route["answer"]
+
+
+def test_compound_query_goes_to_planner(router_module, monkeypatch):
+    router = make_router(router_module, monkeypatch, FakeEngine({"lecturers": ["Dr. Sandesh BJ"]}))
+    assert router.route("Who is Sandesh BJ and when was the university founded?") is None
+
+
+def test_known_entity_routes_to_sql(router_module, monkeypatch):
+    router = make_router(router_module, monkeypatch, FakeEngine({"lecturers": ["Dr. Sandesh BJ"], "clubs": ["Maaya Club"]}))
+    assert router.route("Tell me about maaya")["tool"] == "SQL"
+    assert router.route("who is sandesh bj")["reason"] == "names lecturer 'sandesh bj'"
+
+
+def test_failed_entity_load_is_not_cached(router_module, monkeypatch):
+    engine = FakeEngine(error=RuntimeError("database down"))
+    router = make_router(router_module, monkeypatch, engine)
+    assert router.route("tell me about maaya") is None
+
+    engine.error = None
+    engine.rows_by_table = {"clubs": ["Maaya Club"]}
+    assert router.route("tell me about maaya")["tool"] == "SQL"
+    assert engine.connects == 2
@@ -0,0 +1,58 @@
+from core.db.query_runner import execute_read_only, format_result
+
+
+class FakeResult:
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = list(rows)
+
+    def keys(self):
+        return self.columns
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Returns `rows` for the query itself; the SET statements return nothing."""
+    def __init__(self, columns, rows):
+        self.result = FakeResult(columns, rows)
+        self.statements = []
+
+    def execute(self, statement, params=None, execution_options=None):
+        self.statements.append(str(statement))
+        return self.result if execution_options else None
+
+    def rollback(self):
+        pass
+
+
+def test_small_result_is_complete():
+    session = FakeSession(["name"], [("Dr. Rao",), ("Dr. Meena",)])
+    result = execute_read_only(session, "SELECT name FROM lecturers LIMIT 51", max_rows=50)
+    assert result["rows"] == [("Dr. Rao",), ("Dr. Meena",)]
+    assert not result["truncated"]
+    assert format_result(result) == "Columns: name\n- Dr. Rao\n- Dr. Meena"
+
+
+def test_result_over_the_cap_is_marked_without_a_made_up_count():
+    # The validator's LIMIT lets one row past the cap through, however many rows match
+    session = FakeSession(["name"], [(f"Lecturer {i}",) for i in range(51)])
+    result = execute_read_only(session, "SELECT name FROM lecturers LIMIT 51", max_rows=50)
+    assert len(result["rows"]) == 50
+    assert result["truncated"]
+
+    text = format_result(result)
+    assert text.endswith("... (truncated, more rows not shown)")
+    assert "1 more" not in text
+
+
+def test_byte_cap_truncates_too():
+    session = FakeSession(["about"], [("x" * 600,)] * 5)
+    result = execute_read_only(session, "SELECT about FROM clubs LIMIT 51", max_rows=50, max_bytes=1000)
+    assert len(result["rows"]) == 1
+    assert result["truncated"]
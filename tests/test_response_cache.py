@@ -0,0 +1,37 @@
+import os
+from core.llm.response_cache import ResponseCache
+
+
+def test_disk_hit_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    ResponseCache(path).set("key", "PLANNER", "answer")
+    cache = ResponseCache(path)
+    assert cache.get("key") == "answer"
+    assert cache.snapshot()["disk_hits"] == 1
+
+
+def test_reads_do_not_write(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    writer = ResponseCache(path)
+    writer.set("key", "PLANNER", "answer")
+    reader = ResponseCache(path)
+    reader.get("key")  # opens the connection
+
+    mtime = os.stat(path).st_mtime_ns
+    changes = reader._conn.total_changes
+    for _ in range(3):
+        reader._memory.clear()
+        assert reader.get("key") == "answer"
+    assert reader.get("missing") is None
+    assert reader._conn.total_changes == changes
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm_cache.sqlite3"), ttl_seconds=0)
+    cache.set("key", "PLANNER", "answer")
+    assert cache.get("key") is None
+
+
+def test_different_providers_do_not_share_entries():
+    assert ResponseCache.make_key("google", "m", "PLANNER", "p") != ResponseCache.make_key("anthropic", "m", "PLANNER", "p")
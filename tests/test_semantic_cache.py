@@ -0,0 +1,46 @@
+import os
+import pytest
+import core.pipeline.semantic_cache as semantic_cache_module
+from core.pipeline.semantic_cache import SemanticCache, _key_terms
+
+
+class SameVectorEmbeddings:
+    """Every query embeds identically, the worst case for near-duplicate queries."""
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_cache_module, "get_data_version", lambda: "1")
+    return SemanticCache(SameVectorEmbeddings(), store_path=str(tmp_path / "cache"))
+
+
+def test_key_terms_pick_out_codes_numbers_and_names():
+    assert _key_terms("What are the fees for CS101?") == {"cs101"}
+    assert _key_terms("Which clubs were founded in 2020?") == {"2020"}
+    assert _key_terms("Who is Dr. Rao?") == {"dr", "rao"}
+
+
+def test_different_course_code_is_a_miss(cache):
+    cache.store("What are the fees for CS101?", "CS101 costs 100.")
+    assert cache.lookup("What are the fees for CS102?") is None
+    assert cache.lookup("what are the fees for cs101") == "CS101 costs 100."
+
+
+def test_matching_entry_behind_a_near_duplicate_is_found(cache):
+    cache.store("What are the fees for CS101?", "CS101 costs 100.")
+    cache.store("What are the fees for CS102?", "CS102 costs 200.")
+    assert cache.lookup("fees for CS101") == "CS101 costs 100."
+    assert cache.lookup("fees for CS102") == "CS102 costs 200."
+
+
+def test_stores_are_saved_in_batches_and_on_flush(cache, monkeypatch):
+    monkeypatch.setattr(semantic_cache_module, "SEMANTIC_CACHE_SAVE_INTERVAL", 3600)
+    cache.store("What are the fees for CS101?", "CS101 costs 100.")
+    assert not os.path.exists(cache._entries_file())
+
+    cache.flush()
+    assert sorted(os.listdir(cache.store_path)) == ["entries.json", "queries.index"]
+    reloaded = SemanticCache(SameVectorEmbeddings(), store_path=cache.store_path)
+    assert reloaded.lookup("What are the fees for CS101?") == "CS101 costs 100."
@@ -0,0 +1,58 @@
+import pytest
+from core.pipeline.session_store import InMemorySessionStore, SQLiteSessionStore, _trim
+
+
+def turn(i, answer_chars=10):
+    return [{"role": "user", "content": f"question {i}"}, {"role": "assistant", "content": "a" * answer_chars}]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**caps):
+        if request.param == "memory":
+            return InMemorySessionStore(**caps)
+        return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), **caps)
+    return make
+
+
+def test_trim_drops_whole_turns():
+    messages = turn(1) + turn(2) + turn(3)
+    kept = _trim(messages, max_messages=5, max_chars=10_000)
+    assert kept == turn(2) + turn(3)
+
+
+def test_trim_never_starts_with_an_assistant_message():
+    messages = [{"role": "assistant", "content": "orphan"}] + turn(1) + turn(2)
+    kept = _trim(messages, max_messages=4, max_chars=10_000)
+    assert kept[0]["role"] == "user"
+    assert kept == turn(1) + turn(2)
+
+
+def test_trim_by_size_keeps_the_latest_turn():
+    messages = turn(1, answer_chars=100) + turn(2, answer_chars=100)
+    assert _trim(messages, max_messages=0, max_chars=50) == turn(2, answer_chars=100)
+
+
+def test_append_keeps_everything_until_trimmed(make_store):
+    store = make_store(max_messages=4, max_chars=10_000)
+    session_id = store.create()
+    for i in range(3):
+        store.append(session_id, turn(i))
+    assert len(store.get_history(session_id)) == 6
+
+    store.trim(session_id)
+    assert store.get_history(session_id) == turn(1) + turn(2)
+
+
+def test_compact_replaces_summary_and_drops_covered_turns(make_store):
+    store = make_store()
+    session_id = store.create()
+    for i in range(3):
+        store.append(session_id, turn(i))
+    store.compact(session_id, "asked about 0 and 1", 4)
+    assert store.get_summary(session_id) == "asked about 0 and 1"
+    assert store.get_history(session_id) == turn(2)
+
+
+def test_unknown_session_has_no_history(make_store):
+    assert make_store().get_history("missing") is None
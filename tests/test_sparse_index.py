@@ -0,0 +1,34 @@
+from core.rag.sparse_index import SparseIndex, reciprocal_rank_fusion, tokenize
+
+CHUNKS = [
+    ("a", "UE20CS301 Data Structures is taught by Dr. Rao in the CSE department."),
+    ("b", "The robotics club meets on Fridays in the mechanical block."),
+    ("c", "Dr. Meena teaches UE20CS302 Operating Systems."),
+]
+
+
+def test_tokenize_keeps_codes_and_drops_stopwords():
+    assert tokenize("What is UE20CS301 about?") == ["ue20cs301", "about"]
+
+
+def test_search_ranks_exact_terms_first():
+    index = SparseIndex.build(CHUNKS)
+    assert [doc_id for doc_id, _ in index.search("ue20cs301", k=3)] == ["a"]
+    assert index.search("robotics club", k=1)[0][0] == "b"
+    assert index.search("the of", k=3) == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = SparseIndex.build(CHUNKS)
+    index.save(str(tmp_path))
+    loaded = SparseIndex.load(str(tmp_path))
+    assert loaded.search("operating systems", k=3) == index.search("operating systems", k=3)
+    assert SparseIndex.load(str(tmp_path / "missing")) is None
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    dense = ["x", "a", "b"]
+    sparse = ["a", "y", "b"]
+    fused = reciprocal_rank_fusion([dense, sparse], k=3, rrf_k=60)
+    # Chunks found by both rankings beat those ranked higher by only one
+    assert fused == ["a", "b", "x"]
@@ -0,0 +1,55 @@
+import pytest
+from core.pipeline import data_version
+from core.db.sql_template_cache import SQLTemplateCache, extract_slots
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_version, "DATA_VERSION_PATH", str(tmp_path / "data_version"))
+    return SQLTemplateCache(path=str(tmp_path / "sql_templates.json"))
+
+
+def test_extract_slots_normalizes_names_and_numbers():
+    normalized, slots = extract_slots("Which clubs did Dr. Asha Rao found in 2019?")
+    assert normalized == "which clubs did dr <NAME> found in <NUM>"
+    assert slots == [{"kind": "NAME", "value": "Asha Rao"}, {"kind": "NUM", "value": "2019"}]
+
+
+def test_template_is_reused_with_new_slot_values(cache):
+    cache.store("Which clubs were founded in 2019?", "SELECT name FROM clubs WHERE founded_year = 2019 LIMIT 51")
+    sql, params = cache.lookup("Which clubs were founded in 2021?")
+    assert sql == "SELECT name FROM clubs WHERE founded_year = :tpl_0 LIMIT 51"
+    assert params == {"tpl_0": 2021}
+
+
+def test_limit_is_never_bound_to_a_slot(cache):
+    cache.store("Which clubs have 5 members?", "SELECT name FROM clubs WHERE members = 5 LIMIT 5")
+    sql, params = cache.lookup("Which clubs have 10 members?")
+    assert sql == "SELECT name FROM clubs WHERE members = :tpl_0 LIMIT 5"
+    assert params == {"tpl_0": 10}
+
+
+def test_slot_only_found_in_limit_is_not_cached(cache):
+    cache.store("Show 5 lecturers", "SELECT name FROM lecturers LIMIT 5")
+    assert cache.lookup("Show 500 lecturers") is None
+    assert cache.snapshot()["rejected"] == 1
+
+
+def test_slot_matching_several_literals_is_not_cached(cache):
+    cache.store(
+        "Which clubs have 5 members?",
+        "SELECT name FROM clubs WHERE members = 5 OR events = 5 LIMIT 51"
+    )
+    assert cache.lookup("Which clubs have 10 members?") is None
+    assert cache.snapshot()["rejected"] == 1
+
+
+def test_saves_are_batched_and_flushed(cache, tmp_path):
+    cache.store("Which clubs were founded in 2019?", "SELECT name FROM clubs WHERE founded_year = 2019 LIMIT 51")
+    # Within the save interval nothing is written yet
+    assert not (tmp_path / "sql_templates.json").exists()
+
+    cache.flush()
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith("sql_templates")] == ["sql_templates.json"]
+    reloaded = SQLTemplateCache(path=str(tmp_path / "sql_templates.json"))
+    assert reloaded.lookup("Which clubs were founded in 2020?")[1] == {"tpl_0": 2020}
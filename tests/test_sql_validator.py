@@ -0,0 +1,102 @@
+import os
+from core.db import sql_validator
+from core.db.sql_validator import validate_and_repair
+
+TABLES = {
+    "lecturers": ["id", "name", "designation", "department"],
+    "clubs": ["id", "club_name", "Faculty Coordinator"],
+}
+
+
+def test_missing_limit_is_added():
+    sql, repairs, error = validate_and_repair("SELECT name FROM lecturers", TABLES, default_limit=51)
+    assert error is None
+    assert sql == "SELECT name FROM lecturers LIMIT 51"
+    assert "added LIMIT 51" in repairs
+
+
+def test_default_limit_is_one_more_than_the_runner_keeps():
+    assert sql_validator.SQL_DEFAULT_LIMIT == int(os.getenv("SQL_MAX_ROWS", 50)) + 1
+
+
+def test_existing_outer_limit_is_kept():
+    sql, repairs, error = validate_and_repair("SELECT name FROM lecturers LIMIT 5", TABLES, default_limit=51)
+    assert error is None
+    assert sql == "SELECT name FROM lecturers LIMIT 5"
+    assert not any("LIMIT" in r for r in repairs)
+
+
+def test_limit_inside_subquery_still_gets_outer_limit():
+    sql, _, error = validate_and_repair(
+        "SELECT name FROM lecturers WHERE id IN (SELECT id FROM lecturers LIMIT 3)", TABLES, default_limit=51
+    )
+    assert error is None
+    assert sql.endswith("LIMIT 3) LIMIT 51")
+
+
+def test_limit_inside_cte_still_gets_outer_limit():
+    sql, _, error = validate_and_repair(
+        "WITH top AS (SELECT name FROM lecturers LIMIT 3) SELECT name FROM top", TABLES, default_limit=51
+    )
+    assert error is None
+    assert sql.endswith("FROM top LIMIT 51")
+
+
+def test_misspelled_table_is_repaired():
+    sql, repairs, error = validate_and_repair("SELECT name FROM lecturer", TABLES, default_limit=51)
+    assert error is None
+    assert sql == "SELECT name FROM lecturers LIMIT 51"
+    assert "table 'lecturer' -> 'lecturers'" in repairs
+
+
+def test_misspelled_column_is_repaired_with_and_without_alias():
+    sql, _, error = validate_and_repair("SELECT l.nme, nme FROM lecturers l", TABLES, default_limit=51)
+    assert error is None
+    assert sql == "SELECT l.name, name FROM lecturers l LIMIT 51"
+
+
+def test_spaced_column_is_quoted():
+    for column in ("Faculty Coordinator", "faculty coordinator"):
+        sql, _, error = validate_and_repair(f"SELECT {column} FROM clubs", TABLES, default_limit=51)
+        assert error is None
+        assert sql == 'SELECT "Faculty Coordinator" FROM clubs LIMIT 51'
+
+
+def test_quoted_column_with_wrong_case_is_repaired():
+    sql, repairs, error = validate_and_repair('SELECT "NAME" FROM lecturers LIMIT 1', TABLES, default_limit=51)
+    assert error is None
+    assert sql == "SELECT name FROM lecturers LIMIT 1"
+    assert "column 'NAME' -> 'name'" in repairs
+
+    sql, _, error = validate_and_repair('SELECT "faculty coordinator" FROM clubs LIMIT 1', TABLES, default_limit=51)
+    assert error is None
+    assert sql == 'SELECT "Faculty Coordinator" FROM clubs LIMIT 1'
+
+
+def test_string_literals_are_left_alone():
+    sql, _, error = validate_and_repair(
+        "SELECT club_name FROM clubs WHERE club_name = 'Faculty Coordinator' LIMIT 1", TABLES, default_limit=51
+    )
+    assert error is None
+    assert "'Faculty Coordinator'" in sql
+
+
+def test_trailing_semicolon_is_stripped():
+    sql, _, error = validate_and_repair("SELECT name FROM lecturers LIMIT 2;", TABLES, default_limit=51)
+    assert error is None
+    assert sql == "SELECT name FROM lecturers LIMIT 2"
+
+
+def test_stacked_statements_are_rejected():
+    _, _, error = validate_and_repair("SELECT name FROM lecturers; DROP TABLE clubs", TABLES, default_limit=51)
+    assert error == "Only a single SQL statement is allowed."
+
+
+def test_non_select_is_rejected():
+    _, _, error = validate_and_repair("DELETE FROM clubs", TABLES, default_limit=51)
+    assert error == "Only a single SELECT statement is allowed."
+
+
+def test_unknown_table_is_rejected():
+    _, _, error = validate_and_repair("SELECT name FROM students", TABLES, default_limit=51)
+    assert error == "Table 'students' does not exist. Available tables: clubs, lecturers."
@@ -0,0 +1,67 @@
+import hashlib
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+import core.rag.vector_store as vector_store_module
+from core.rag.index_factory import default_index_config
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic unit vectors derived from the text, so no model is needed."""
+    def __init__(self, **kwargs):
+        pass
+
+    def _embed(self, text):
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(16).astype("float32")
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def make_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store_module, "HuggingFaceEmbeddings", FakeEmbeddings)
+    return lambda: vector_store_module.VectorStore(str(tmp_path / "store"))
+
+
+def chunks(prefix, count):
+    texts = [f"{prefix} chunk number {i}" for i in range(count)]
+    return [Document(page_content=text) for text in texts], [f"{prefix}:{i}" for i in range(count)]
+
+
+def assert_mapping_matches(store):
+    for position, doc_id in store.db.index_to_docstore_id.items():
+        text = store.db.docstore.search(doc_id).page_content
+        assert store.search_faiss(text, 1) == [text], f"position {position} ({doc_id}) maps to the wrong chunk"
+
+
+def test_flat_store_deletes_and_adds_in_place(make_store):
+    store = make_store()
+    docs, ids = chunks("a", 50)
+    assert store.build_from_chunks(docs, default_index_config("flat"), ids)
+
+    assert store.delete_chunks(ids[:10])
+    store.add_chunks(*chunks("b", 10))
+
+    assert store.db.index.ntotal == 50
+    assert_mapping_matches(store)
+
+
+def test_ivf_store_refuses_deletes_and_keeps_mapping(make_store):
+    store = make_store()
+    docs, ids = chunks("a", 120)
+    config = {**default_index_config("ivf"), "nlist": 2, "nprobe": 2}
+    assert store.build_from_chunks(docs, config, ids)
+    assert store.index_config["type"] == "ivf"
+
+    assert not store.delete_chunks(ids[:10])
+    store.add_chunks(*chunks("b", 10))
+
+    assert store.db.index.ntotal == 130
+    assert_mapping_matches(store)